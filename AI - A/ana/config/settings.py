@@ -2,128 +2,217 @@
 # Ana AI Assistant - Settings Module (Minimal Implementation)
 
 import os
+import copy
 import json
 import logging
-from typing import Dict, Any
+import tempfile
+from typing import Dict, Any, Optional, Set, Tuple
+
+# Optional fast JSON backend, falling back to the standard library; both write the same
+# 2-space indented UTF-8 so saved files don't change format with the installed backend
+try:
+    import orjson
+    
+    _loads = orjson.loads
+    
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    _loads = json.loads
+    
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
 
 logger = logging.getLogger('Ana.Config')
 
-def load_settings() -> Dict[str, Any]:
-    """Load application settings from config file or use defaults"""
-    config_dir = os.path.dirname(os.path.abspath(__file__))
-    settings_path = os.path.join(config_dir, "settings.json")
-    
-    # Default settings
-    default_settings = {
-        "assistant": {
-            "name": "Ana",
-            "wake_word": "ana",
-            "weather_location": "New York",
-            "self_evolution": {
-                "auto_update": False
-            },
-            "openai": {
-                "enabled": False,
-                "api_key": "",
-                "model": "gpt-3.5-turbo"
-            }
-        },
-        "voice": {
-            "tts_engine": "pyttsx3",
-            "voice_id": "en-US-female-1",
-            "language": "en-US",
-            "pitch": 1.0,
-            "rate": 1.0,
-            "volume": 1.0,
-            "wake_word": "ana",
-            "wake_word_sensitivity": 0.6,
-            "continuous_listen": False,
-            "auto_adjust_ambient": True
-        },
-        "memory": {
-            "storage_type": "sqlite",
-            "max_history_items": 1000,
-            "cloud_sync": False
-        },
-        "features": {
-            "facial_recognition": {
-                "enabled": False
-            }
-        },
-        "ui": {
-            "theme": "cyberpunk",
-            "color_scheme": "dark",
-            "enable_animations": True,
-            "accent_color": "#00E5FF",
-            "secondary_color": "#FF3C78"
-        },
-        "security": {
-            "require_google_login": True,
-            "allowed_domains": [],  # Empty means all domains are allowed
-            "session_timeout_minutes": 60,
-            "auto_lock": False
+# Paths resolved once at import
+_CONFIG_DIR = os.path.dirname(os.path.abspath(__file__))
+_SETTINGS_PATH = os.path.join(_CONFIG_DIR, "settings.json")
+_APP_DIR = os.path.dirname(_CONFIG_DIR)
+_DATA_DIR = os.path.join(_APP_DIR, "data")
+
+# Parsed config files keyed by path -> (st_mtime_ns, st_size, data)
+_SETTINGS_CACHE: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+_JSON_CACHE: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+
+# Directories already created by this process
+_ENSURED_DIRS: Set[str] = set()
+
+# Default settings, built once at import and deep-copied by _merge_dicts
+_DEFAULT_SETTINGS: Dict[str, Any] = {
+    "assistant": {
+        "name": "Ana",
+        "wake_word": "ana",
+        "weather_location": "New York",
+        "self_evolution": {
+            "auto_update": False
         },
-        "user": {
-            "email": "",
-            "name": "",
-            "picture": ""
+        "openai": {
+            "enabled": False,
+            "api_key": "",
+            "model": "gpt-3.5-turbo"
+        }
+    },
+    "voice": {
+        "tts_engine": "pyttsx3",
+        "voice_id": "en-US-female-1",
+        "language": "en-US",
+        "pitch": 1.0,
+        "rate": 1.0,
+        "volume": 1.0,
+        "wake_word": "ana",
+        "wake_word_sensitivity": 0.6,
+        "continuous_listen": False,
+        "auto_adjust_ambient": True
+    },
+    "memory": {
+        "storage_type": "sqlite",
+        "max_history_items": 1000,
+        "cloud_sync": False
+    },
+    "features": {
+        "facial_recognition": {
+            "enabled": False
         }
+    },
+    "ui": {
+        "theme": "cyberpunk",
+        "color_scheme": "dark",
+        "enable_animations": True,
+        "accent_color": "#00E5FF",
+        "secondary_color": "#FF3C78"
+    },
+    "security": {
+        "require_google_login": True,
+        "allowed_domains": [],  # Empty means all domains are allowed
+        "session_timeout_minutes": 60,
+        "auto_lock": False
+    },
+    "user": {
+        "email": "",
+        "name": "",
+        "picture": ""
     }
+}
+
+
+def load_settings() -> Dict[str, Any]:
+    """Load application settings from config file or use defaults"""
+    settings_path = _SETTINGS_PATH
+    
+    # Reuse the merged settings while the file is unchanged on disk
+    try:
+        stat = os.stat(settings_path)
+        cached = _SETTINGS_CACHE.get(settings_path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return copy.deepcopy(cached[2])
+    except OSError:
+        pass
     
     # Try to load settings from file
     try:
-        if os.path.exists(settings_path):
-            with open(settings_path, 'r') as f:
-                user_settings = json.load(f)
-                # Merge user settings with defaults
-                merged_settings = _merge_dicts(default_settings, user_settings)
-                logger.info("Settings loaded from %s", settings_path)
-                return merged_settings
+        with open(settings_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            user_settings = _loads(f.read())
+        # Merge user settings with defaults
+        merged_settings = _merge_dicts(_DEFAULT_SETTINGS, user_settings)
+        _SETTINGS_CACHE[settings_path] = (stat.st_mtime_ns, stat.st_size, merged_settings)
+        logger.info("Settings loaded from %s", settings_path)
+        return copy.deepcopy(merged_settings)
+    except FileNotFoundError:
+        pass
     except Exception as e:
         logger.error("Error loading settings: %s", str(e))
     
     # Create default settings file if it doesn't exist
     try:
-        os.makedirs(os.path.dirname(settings_path), exist_ok=True)
-        with open(settings_path, 'w') as f:
-            json.dump(default_settings, f, indent=4)
+        ensure_dir(_CONFIG_DIR)
+        with open(settings_path, 'wb') as f:
+            f.write(_dumps(_DEFAULT_SETTINGS))
         logger.info("Default settings created at %s", settings_path)
     except Exception as e:
         logger.error("Error creating default settings: %s", str(e))
     
-    return default_settings
+    return copy.deepcopy(_DEFAULT_SETTINGS)
+
+def ensure_dir(path: str) -> str:
+    """Create a directory, skipping the syscall if this process already created it"""
+    if path not in _ENSURED_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _ENSURED_DIRS.add(path)
+    return path
 
 def _merge_dicts(default: Dict[str, Any], user: Dict[str, Any]) -> Dict[str, Any]:
-    """Recursively merge user settings into default settings"""
-    result = default.copy()
+    """Merge user settings into a single deep copy of the default settings"""
+    result = copy.deepcopy(default)
+    stack = [(result, user)]
     
-    for key, value in user.items():
-        if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-            result[key] = _merge_dicts(result[key], value)
-        else:
-            result[key] = value
+    while stack:
+        dst, src = stack.pop()
+        for key, value in src.items():
+            current = dst.get(key)
+            if type(current) is dict and type(value) is dict:
+                stack.append((current, value))
+            else:
+                dst[key] = value
     
     return result
 
+def load_json_cached(path: str) -> Optional[Dict[str, Any]]:
+    """Load a JSON config file, reusing the parsed data while its mtime and size are unchanged"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    
+    cached = _JSON_CACHE.get(path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return copy.deepcopy(cached[2])
+    
+    with open(path, 'rb') as f:
+        data = _loads(f.read())
+    
+    _JSON_CACHE[path] = (stat.st_mtime_ns, stat.st_size, data)
+    return copy.deepcopy(data)
+
 def save_settings(settings: Dict[str, Any]) -> bool:
     """Save settings to config file"""
-    config_dir = os.path.dirname(os.path.abspath(__file__))
-    settings_path = os.path.join(config_dir, "settings.json")
+    settings_path = _SETTINGS_PATH
+    tmp_path = None
     
     try:
-        os.makedirs(os.path.dirname(settings_path), exist_ok=True)
-        with open(settings_path, 'w') as f:
-            json.dump(settings, f, indent=4)
+        ensure_dir(_CONFIG_DIR)
+        # Write to a uniquely named temporary file and swap it in, so a crash never leaves a
+        # partial file and concurrent saves (e.g. the health token refresh) never share one
+        fd, tmp_path = tempfile.mkstemp(prefix="settings.", suffix=".tmp", dir=_CONFIG_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_dumps(settings))
+            f.flush()
+            os.fsync(f.fileno())
+        
+        # Keep the permissions of the file being replaced, since it may hold API tokens
+        try:
+            os.chmod(tmp_path, os.stat(settings_path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        
+        os.replace(tmp_path, settings_path)
+        tmp_path = None
+        _SETTINGS_CACHE.pop(settings_path, None)
+        _JSON_CACHE.pop(settings_path, None)
         logger.info("Settings saved to %s", settings_path)
         return True
     except Exception as e:
         logger.error("Error saving settings: %s", str(e))
         return False
+    finally:
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
 
 def get_app_data_dir() -> str:
     """Get the application data directory"""
     # For simplicity, just use a 'data' directory in the project
-    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_dir = os.path.join(app_dir, "data")
-    os.makedirs(data_dir, exist_ok=True)
-    return data_dir 
\ No newline at end of file
+    return ensure_dir(_DATA_DIR)
\ No newline at end of file
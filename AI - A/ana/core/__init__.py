@@ -1,18 +1,28 @@
 #!/usr/bin/env python3
 # Ana AI Assistant - Core Package
 
-from ana.core.assistant import AnaAssistant
-from ana.core.voice_engine import VoiceEngine
-from ana.core.memory import MemoryManager
-from ana.core.intent_parser import IntentParser
-from ana.core.updater import Updater
-from ana.core.self_dev import SelfEvolution
+import importlib
 
-__all__ = [
-    'AnaAssistant',
-    'VoiceEngine',
-    'MemoryManager',
-    'IntentParser',
-    'Updater',
-    'SelfEvolution'
-] 
\ No newline at end of file
+# Public names and the submodules that define them; each submodule is only
+# imported the first time one of its names is accessed (PEP 562)
+_ATTRS = {
+    'AnaAssistant': '.assistant',
+    'VoiceEngine': '.voice_engine',
+    'MemoryManager': '.memory',
+    'IntentParser': '.intent_parser',
+    'Updater': '.updater',
+    'SelfEvolution': '.self_dev',
+}
+
+__all__ = list(_ATTRS)
+
+def __getattr__(name):
+    if name in _ATTRS:
+        module = importlib.import_module(_ATTRS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -5,11 +5,27 @@ import os
 import json
 import time
 import logging
-import openai
-from typing import Dict, List, Any, Optional, Union
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Any, Optional, Union
 
 logger = logging.getLogger('Ana.AICore')
 
+# Fixed system messages, shared across calls (secure_api_request copies before modifying)
+_SUMMARIZE_SYSTEM_MSG = {"role": "system", "content": "Summarize the following text concisely:"}
+_SENTIMENT_SYSTEM_MSG = {"role": "system", "content": "Analyze the sentiment of the following text. Respond with a JSON object containing 'sentiment' (positive, negative, or neutral), 'score' (from -1 to 1), and 'emotions' (list of detected emotions):"}
+
+# The openai SDK is heavy to import, so load it on the first API call
+_openai = None
+
+def _get_openai():
+    """Import the openai module on first use"""
+    global _openai
+    if _openai is None:
+        import openai
+        _openai = openai
+    return _openai
+
 class AICore:
     """Core AI processing for Ana AI Assistant"""
     
@@ -25,12 +41,30 @@ class AICore:
         self.temperature = ai_settings.get("temperature", 0.7)
         self.max_tokens = ai_settings.get("max_tokens", 1000)
         
-        # Initialize conversation history
-        self.conversation_history = []
+        # Resolved API key, valid while the security manager's credentials epoch is unchanged
+        self._cached_key = None
+        self._cached_key_epoch = -1
+        # Whether the cached key came from secure storage rather than settings
+        self._key_from_storage = False
+        
+        # Background refresh of the cached key, woken when the stored credentials change,
+        # so API calls don't block on the keystore
+        self._key_refresh_stop = threading.Event()
+        self._key_refresh_wake = threading.Event()
+        self._key_refresh_thread = None
+        if self.security_manager is not None and hasattr(self.security_manager, "add_credentials_listener"):
+            self.security_manager.add_credentials_listener(self._key_refresh_wake.set)
+        
+        # Keep-alive HTTP session reused across API calls (created on first use)
+        self._session = None
+        
+        # Initialize conversation history (bounded to the last max_history_length exchanges)
         self.max_history_length = ai_settings.get("max_history_length", 10)
+        self.conversation_history = deque(maxlen=self.max_history_length * 2)
         
         # System prompt that defines Ana's personality and capabilities
         self.system_prompt = ai_settings.get("system_prompt", self._get_default_system_prompt())
+        self._system_msg = {"role": "system", "content": self.system_prompt}
         
         # Store API key securely if security manager is available
         if self.security_manager and self.api_key:
@@ -51,49 +85,119 @@ All your data processing is done locally and securely, with strong encryption an
     
     def start(self):
         """Start the AI Core"""
+        if self.security_manager:
+            # Resolve the key once up front; later refreshes follow credential changes
+            self._key_refresh_stop.clear()
+            self._key_refresh_wake.set()
+            if self._key_refresh_thread is None or not self._key_refresh_thread.is_alive():
+                self._key_refresh_thread = threading.Thread(target=self._key_refresher, daemon=True)
+                self._key_refresh_thread.start()
+        
         logger.info("AI Core started")
         return True
     
     def stop(self):
         """Stop the AI Core"""
+        self._key_refresh_stop.set()
+        self._key_refresh_wake.set()
+        if self._key_refresh_thread is not None:
+            self._key_refresh_thread.join(timeout=1.0)
+        if self._session is not None:
+            self._session.close()
+            self._session = None
         logger.info("AI Core stopped")
         return True
     
+    def _ensure_api_key(self) -> Optional[str]:
+        """Resolve the OpenAI API key and apply it to the client, or return None if unavailable"""
+        if self.security_manager is None:
+            api_key = self.api_key
+        else:
+            epoch = getattr(self.security_manager, "credentials_epoch", 0)
+            if self._cached_key_epoch == epoch and self._cached_key:
+                api_key = self._cached_key
+            else:
+                api_key = self._refresh_api_key(epoch)
+        
+        if api_key == "STORED_SECURELY":
+            logger.error("No API key available for OpenAI")
+            return None
+        
+        openai = _get_openai()
+        openai.api_key = api_key
+        openai.requestssession = self._get_session()
+        return api_key
+    
+    def _refresh_api_key(self, epoch: int) -> str:
+        """Read the API key from secure storage and cache it for the given credentials epoch"""
+        # Use API key from secure storage if available, otherwise the one from settings
+        stored_credentials = self.security_manager.get_api_credentials("openai")
+        if not isinstance(stored_credentials, dict):
+            stored_credentials = {}  # decrypt() can hand back a str or bytes
+        self._key_from_storage = "api_key" in stored_credentials
+        api_key = stored_credentials.get("api_key", self.api_key)
+        if api_key != "STORED_SECURELY":
+            self._cached_key = api_key
+            self._cached_key_epoch = epoch
+        return api_key
+    
+    def _key_refresher(self):
+        """Background loop re-reading the cached API key whenever the stored credentials change"""
+        while True:
+            self._key_refresh_wake.wait()
+            if self._key_refresh_stop.is_set():
+                break
+            # Clear before reading the epoch so a change made during the refresh wakes us again
+            self._key_refresh_wake.clear()
+            
+            try:
+                epoch = getattr(self.security_manager, "credentials_epoch", 0)
+                if self._cached_key_epoch != epoch or not self._cached_key:
+                    self._refresh_api_key(epoch)
+            except Exception as e:
+                logger.error(f"Error refreshing API key: {str(e)}")
+    
+    def _get_session(self):
+        """Get the pooled HTTP session shared by all OpenAI calls, creating it on first use"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            
+            self._session = requests.Session()
+            self._session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+        return self._session
+    
+    def _call(self, endpoint: Callable, request_data: Dict[str, Any], api_key: str):
+        """Send a request to an OpenAI endpoint, applying privacy measures if a security manager is available"""
+        if self.security_manager:
+            # Credentials come from the already-resolved key rather than another keystore read
+            request_data = self.security_manager.secure_api_request("openai", request_data, include_credentials=False)
+            request_data["api_key"] = api_key
+        return endpoint(**request_data)
+    
     def process_input(self, user_input: str) -> str:
         """Process user input and generate a response"""
         try:
-            # Get API credentials securely if using security manager
-            credentials = {}
-            if self.security_manager:
-                stored_credentials = self.security_manager.get_api_credentials("openai")
-                if stored_credentials and "api_key" in stored_credentials:
-                    credentials = stored_credentials
-                    
-                    # Also get conversation history from secure storage
-                    previous_conversations = self.security_manager.get_conversations(limit=self.max_history_length)
-                    if previous_conversations:
-                        # Convert to the format expected by OpenAI
-                        self.conversation_history = []
-                        for conv in previous_conversations:
-                            self.conversation_history.extend([
-                                {"role": "user", "content": conv["user_message"]},
-                                {"role": "assistant", "content": conv["assistant_message"]}
-                            ])
-            
-            # Use API key from credentials if available, otherwise use the one from settings
-            api_key = credentials.get("api_key", self.api_key)
-            if api_key == "STORED_SECURELY" and not credentials.get("api_key"):
-                logger.error("No API key available for OpenAI")
+            # Resolve the API key (cached across calls)
+            api_key = self._ensure_api_key()
+            if api_key is None:
                 return "I'm sorry, but I'm unable to process your request due to a configuration issue."
             
-            # Prepare messages for the API call
-            messages = [{"role": "system", "content": self.system_prompt}]
-            
-            # Add conversation history
-            messages.extend(self.conversation_history[-self.max_history_length*2:])
-            
-            # Add current user input
-            messages.append({"role": "user", "content": user_input})
+            # Also get conversation history from secure storage when the key came from there
+            if self.security_manager and self._key_from_storage:
+                previous_conversations = self.security_manager.get_conversations(limit=self.max_history_length)
+                if previous_conversations:
+                    # Convert to the format expected by OpenAI
+                    self.conversation_history = deque(
+                        (message
+                         for conv in previous_conversations
+                         for message in ({"role": "user", "content": conv["user_message"]},
+                                         {"role": "assistant", "content": conv["assistant_message"]})),
+                        maxlen=self.max_history_length * 2
+                    )
+            
+            # Prepare messages for the API call: system prompt, history, current user input
+            messages = [self._system_msg, *self.conversation_history, {"role": "user", "content": user_input}]
             
             # Prepare the API request with privacy protections
             request_data = {
@@ -104,16 +208,8 @@ All your data processing is done locally and securely, with strong encryption an
                 "user": "anonymous_user"  # Default anonymous user ID
             }
             
-            # Apply privacy measures if security manager is available
-            if self.security_manager:
-                request_data = self.security_manager.secure_api_request("openai", request_data)
-                # Override API key from the secure storage
-                openai.api_key = api_key
-            else:
-                openai.api_key = api_key
-            
-            # Make the API call
-            response = openai.ChatCompletion.create(**request_data)
+            # Make the API call with privacy measures applied
+            response = self._call(_get_openai().ChatCompletion.create, request_data, api_key)
             
             # Extract the response text
             response_text = response.choices[0].message.content.strip()
@@ -127,10 +223,6 @@ All your data processing is done locally and securely, with strong encryption an
             self.conversation_history.append({"role": "user", "content": user_input})
             self.conversation_history.append({"role": "assistant", "content": response_text})
             
-            # Trim history if it gets too long
-            if len(self.conversation_history) > self.max_history_length * 2:
-                self.conversation_history = self.conversation_history[-self.max_history_length*2:]
-            
             return response_text
             
         except Exception as e:
@@ -140,20 +232,10 @@ All your data processing is done locally and securely, with strong encryption an
     def get_embeddings(self, text: str) -> List[float]:
         """Get embeddings for text using OpenAI API"""
         try:
-            # Get API credentials securely if using security manager
-            credentials = {}
-            if self.security_manager:
-                stored_credentials = self.security_manager.get_api_credentials("openai")
-                if stored_credentials and "api_key" in stored_credentials:
-                    credentials = stored_credentials
-            
-            # Use API key from credentials if available, otherwise use the one from settings
-            api_key = credentials.get("api_key", self.api_key)
-            if api_key == "STORED_SECURELY" and not credentials.get("api_key"):
-                logger.error("No API key available for OpenAI")
+            # Resolve the API key (cached across calls)
+            api_key = self._ensure_api_key()
+            if api_key is None:
                 return []
-                
-            openai.api_key = api_key
             
             # Prepare the API request with privacy protections
             request_data = {
@@ -161,14 +243,8 @@ All your data processing is done locally and securely, with strong encryption an
                 "model": "text-embedding-ada-002"
             }
             
-            # Apply privacy measures if security manager is available
-            if self.security_manager:
-                request_data = self.security_manager.secure_api_request("openai", request_data)
-                # Override API key from the secure storage
-                openai.api_key = api_key
-            
-            # Make the API call
-            response = openai.Embedding.create(**request_data)
+            # Make the API call with privacy measures applied
+            response = self._call(_get_openai().Embedding.create, request_data, api_key)
             
             # Extract the embeddings
             embeddings = response['data'][0]['embedding']
@@ -184,24 +260,14 @@ All your data processing is done locally and securely, with strong encryption an
         try:
             # Prepare messages for the API call
             messages = [
-                {"role": "system", "content": "Summarize the following text concisely:"},
+                _SUMMARIZE_SYSTEM_MSG,
                 {"role": "user", "content": text}
             ]
             
-            # Get API credentials securely if using security manager
-            credentials = {}
-            if self.security_manager:
-                stored_credentials = self.security_manager.get_api_credentials("openai")
-                if stored_credentials and "api_key" in stored_credentials:
-                    credentials = stored_credentials
-            
-            # Use API key from credentials if available, otherwise use the one from settings
-            api_key = credentials.get("api_key", self.api_key)
-            if api_key == "STORED_SECURELY" and not credentials.get("api_key"):
-                logger.error("No API key available for OpenAI")
+            # Resolve the API key (cached across calls)
+            api_key = self._ensure_api_key()
+            if api_key is None:
                 return "Unable to summarize due to a configuration issue."
-                
-            openai.api_key = api_key
             
             # Prepare the API request with privacy protections
             request_data = {
@@ -211,14 +277,8 @@ All your data processing is done locally and securely, with strong encryption an
                 "max_tokens": max_tokens
             }
             
-            # Apply privacy measures if security manager is available
-            if self.security_manager:
-                request_data = self.security_manager.secure_api_request("openai", request_data)
-                # Override API key from the secure storage
-                openai.api_key = api_key
-            
-            # Make the API call
-            response = openai.ChatCompletion.create(**request_data)
+            # Make the API call with privacy measures applied
+            response = self._call(_get_openai().ChatCompletion.create, request_data, api_key)
             
             # Extract the response text
             summary = response.choices[0].message.content.strip()
@@ -234,24 +294,14 @@ All your data processing is done locally and securely, with strong encryption an
         try:
             # Prepare messages for the API call
             messages = [
-                {"role": "system", "content": "Analyze the sentiment of the following text. Respond with a JSON object containing 'sentiment' (positive, negative, or neutral), 'score' (from -1 to 1), and 'emotions' (list of detected emotions):"},
+                _SENTIMENT_SYSTEM_MSG,
                 {"role": "user", "content": text}
             ]
             
-            # Get API credentials securely if using security manager
-            credentials = {}
-            if self.security_manager:
-                stored_credentials = self.security_manager.get_api_credentials("openai")
-                if stored_credentials and "api_key" in stored_credentials:
-                    credentials = stored_credentials
-            
-            # Use API key from credentials if available, otherwise use the one from settings
-            api_key = credentials.get("api_key", self.api_key)
-            if api_key == "STORED_SECURELY" and not credentials.get("api_key"):
-                logger.error("No API key available for OpenAI")
+            # Resolve the API key (cached across calls)
+            api_key = self._ensure_api_key()
+            if api_key is None:
                 return {"sentiment": "neutral", "score": 0, "emotions": []}
-                
-            openai.api_key = api_key
             
             # Prepare the API request with privacy protections
             request_data = {
@@ -262,14 +312,8 @@ All your data processing is done locally and securely, with strong encryption an
                 "response_format": {"type": "json_object"}
             }
             
-            # Apply privacy measures if security manager is available
-            if self.security_manager:
-                request_data = self.security_manager.secure_api_request("openai", request_data)
-                # Override API key from the secure storage
-                openai.api_key = api_key
-            
-            # Make the API call
-            response = openai.ChatCompletion.create(**request_data)
+            # Make the API call with privacy measures applied
+            response = self._call(_get_openai().ChatCompletion.create, request_data, api_key)
             
             # Extract the response text
             analysis_text = response.choices[0].message.content.strip()
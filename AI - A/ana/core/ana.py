@@ -2,36 +2,64 @@
 # Ana AI Assistant - Main Application Module
 
 import os
+import re
 import sys
-import json
 import time
 import logging
 import threading
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from functools import cached_property, lru_cache
+from typing import Dict, Iterator, Any, Optional
 from datetime import datetime
 
-# Core modules
-from .voice_engine import VoiceEngine
-from .facial_recognition import FacialRecognition
-from .self_dev import SelfDev
-from .health_integration import HealthIntegration
-from .ai_core import AICore
-from .youtube_music import YouTubeMusic
-from .ui_controller import UIController
+# Core modules (other components are imported lazily by their properties)
 from .security import SecurityManager
+from ..config.settings import ensure_dir, load_json_cached
 
-# Configure logging
+# Optional fast JSON encoder for log output, falling back to the standard library
+try:
+    import orjson
+    
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+except ImportError:
+    import json
+    
+    _dumps = json.dumps
+
+# Configure logging (the log file is only opened when the first record is written)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.StreamHandler(),
-        logging.FileHandler(os.path.join(os.path.dirname(__file__), "..", "logs", "ana.log"))
+        logging.FileHandler(os.path.join(os.path.dirname(__file__), "..", "logs", "ana.log"), delay=True)
     ]
 )
 logger = logging.getLogger('Ana')
 
+# Number in a "volume" command, e.g. "set volume to 40"
+_VOLUME_RE = re.compile(r'(\d+)')
+
+# Any keyword handled by process_command, so plain conversation skips the dispatch chain
+_COMMAND_RE = re.compile(r'play music|stop music|volume|health|fitness|privacy|security')
+
+# Keywords for classifying commands in conversation metadata, checked in order; the
+# lookahead lets keywords overlap (e.g. "stepsong") so a match never hides a higher-priority one
+_COMMAND_TYPE_KEYWORDS = (
+    ("music", ("play", "music", "song")),
+    ("health", ("health", "fitness", "steps")),
+    ("privacy", ("privacy", "security", "data")),
+    ("development", ("github", "code", "development")),
+)
+_COMMAND_TYPE_RE = re.compile("(?=" + "|".join(
+    f"(?P<{command_type}>{'|'.join(map(re.escape, keywords))})"
+    for command_type, keywords in _COMMAND_TYPE_KEYWORDS
+) + ")")
+
+# Config files merged into the settings, later files taking precedence
+CONFIG_FILES = ("settings.json", "health_settings.json", "voice_settings.json", "security_settings.json")
+
 class Ana:
     """Main Ana AI Assistant class - integrates all components"""
     
@@ -48,27 +76,67 @@ class Ana:
         # Initialize security manager first (required by other components)
         self.security_manager = SecurityManager(self.settings)
         
-        # Initialize components
-        self.ai_core = AICore(self.settings, self.security_manager)
-        self.voice_engine = VoiceEngine(self.settings, self.security_manager)
-        self.facial_recognition = FacialRecognition(self.settings, self.security_manager)
-        self.self_dev = SelfDev(self.settings, self.security_manager)
-        self.youtube_music = YouTubeMusic(self.settings, self.security_manager)
-        self.health_integration = HealthIntegration(self.settings, self.security_manager)
-        
-        # UI controller needs to be initialized last
-        self.ui_controller = UIController(self, self.settings)
+        # Other components are constructed on first access (see the properties below)
         
         # State variables
         self.running = False
         self.is_listening = False
         self.current_task = None
         
+        # UI state waiting to be sent; updates arriving within one frame are merged
+        self._pending_ui_state = {}
+        self._ui_state_lock = threading.Lock()
+        self._ui_dirty = threading.Event()
+        self._ui_flush_interval = 0.016
+        self._ui_flush_thread = None
+        
         # Session tracking
         self.session_id = datetime.now().strftime("%Y%m%d%H%M%S")
         
         logger.info("Ana AI Assistant initialized")
     
+    @cached_property
+    def ai_core(self):
+        """AI core, constructed on first access"""
+        from .ai_core import AICore
+        return AICore(self.settings, self.security_manager)
+    
+    @cached_property
+    def voice_engine(self):
+        """Voice engine, constructed on first access"""
+        from .voice_engine import VoiceEngine
+        return VoiceEngine(self.settings, self.security_manager)
+    
+    @cached_property
+    def facial_recognition(self):
+        """Facial recognition, constructed on first access"""
+        from .facial_recognition import FacialRecognition
+        return FacialRecognition(self.settings, self.security_manager)
+    
+    @cached_property
+    def self_dev(self):
+        """Self-development module, constructed on first access"""
+        from .self_dev import SelfDev
+        return SelfDev(self.settings, self.security_manager)
+    
+    @cached_property
+    def youtube_music(self):
+        """YouTube Music module, constructed on first access"""
+        from .youtube_music import YouTubeMusic
+        return YouTubeMusic(self.settings, self.security_manager)
+    
+    @cached_property
+    def health_integration(self):
+        """Health integration module, constructed on first access"""
+        from .health_integration import HealthIntegration
+        return HealthIntegration(self.settings, self.security_manager)
+    
+    @cached_property
+    def ui_controller(self):
+        """UI controller, constructed on first access"""
+        from .ui_controller import UIController
+        return UIController(self, self.settings)
+    
     def _create_directories(self):
         """Create necessary directories for Ana"""
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -85,9 +153,9 @@ class Ana:
         ]
         
         for directory in directories:
-            os.makedirs(directory, exist_ok=True)
+            ensure_dir(directory)
             
-        logger.info(f"Created necessary directories")
+        logger.info("Created necessary directories")
     
     def _load_settings(self) -> Dict[str, Any]:
         """Load settings from configuration files"""
@@ -96,31 +164,22 @@ class Ana:
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         config_dir = os.path.join(base_dir, "config")
         
-        # Load main settings
-        main_settings_path = os.path.join(config_dir, "settings.json")
-        if os.path.exists(main_settings_path):
-            with open(main_settings_path, 'r') as f:
-                settings.update(json.load(f))
-        
-        # Load health settings
-        health_settings_path = os.path.join(config_dir, "health_settings.json")
-        if os.path.exists(health_settings_path):
-            with open(health_settings_path, 'r') as f:
-                settings.update(json.load(f))
-        
-        # Load voice settings
-        voice_settings_path = os.path.join(config_dir, "voice_settings.json")
-        if os.path.exists(voice_settings_path):
-            with open(voice_settings_path, 'r') as f:
-                settings.update(json.load(f))
-        
-        # Load security settings
-        security_settings_path = os.path.join(config_dir, "security_settings.json")
-        if os.path.exists(security_settings_path):
-            with open(security_settings_path, 'r') as f:
-                settings.update(json.load(f))
-        
-        logger.info(f"Loaded settings from configuration files")
+        # Find which config files exist with a single directory scan
+        try:
+            with os.scandir(config_dir) as entries:
+                present = {entry.name: entry.path for entry in entries
+                           if entry.name in CONFIG_FILES and entry.is_file()}
+        except OSError:
+            present = {}
+        
+        # Load main, health, voice and security settings, in that order
+        for name in CONFIG_FILES:
+            if name in present:
+                data = load_json_cached(present[name])
+                if data:
+                    settings.update(data)
+        
+        logger.info("Loaded settings from configuration files")
         return settings
     
     def start(self):
@@ -150,6 +209,9 @@ class Ana:
         
         # Start UI controller (should be last)
         self.ui_controller.start()
+        if self._ui_flush_thread is None or not self._ui_flush_thread.is_alive():
+            self._ui_flush_thread = threading.Thread(target=self._ui_flush_loop, daemon=True)
+            self._ui_flush_thread.start()
         
         logger.info("Ana AI Assistant started successfully")
         
@@ -160,15 +222,24 @@ class Ana:
         """Stop Ana AI Assistant"""
         logger.info("Stopping Ana AI Assistant")
         self.running = False
-        
-        # Stop components in reverse order
-        self.ui_controller.stop()
-        self.health_integration.shutdown()
-        self.youtube_music.stop()
-        self.self_dev.stop()
-        self.facial_recognition.stop()
-        self.voice_engine.stop()
-        self.ai_core.stop()
+        self._ui_dirty.set()
+        
+        # Let the flush loop send its last pending state before the UI controller stops
+        if self._ui_flush_thread is not None and self._ui_flush_thread is not threading.current_thread():
+            self._ui_flush_thread.join(timeout=1.0)
+        
+        # Stop components in reverse order, skipping any that were never constructed
+        for name, method in (("ui_controller", "stop"),
+                             ("health_integration", "shutdown"),
+                             ("youtube_music", "stop"),
+                             ("self_dev", "stop"),
+                             ("facial_recognition", "stop"),
+                             ("voice_engine", "stop"),
+                             ("ai_core", "stop"),
+                             ("security_manager", "close")):
+            component = self.__dict__.get(name)
+            if component is not None:
+                getattr(component, method)()
         
         logger.info("Ana AI Assistant stopped")
     
@@ -185,7 +256,7 @@ class Ana:
     
     def process_command(self, command: str) -> str:
         """Process a voice command"""
-        logger.info(f"Processing command: {command}")
+        logger.info("Processing command: %s", command)
         
         # Record metadata for the conversation
         metadata = {
@@ -207,9 +278,13 @@ class Ana:
         )
         
         # Look for specific command patterns
-        if "play music" in command.lower():
+        command_lower = command.lower()
+        if not _COMMAND_RE.search(command_lower):
+            return response
+        
+        if "play music" in command_lower:
             # Extract song name
-            song = command.lower().replace("play music", "").strip()
+            song = command_lower.replace("play music", "").strip()
             if song:
                 self.youtube_music.play_song(song)
                 return f"Playing {song}"
@@ -217,87 +292,83 @@ class Ana:
                 self.youtube_music.play()
                 return "Playing music"
         
-        elif "stop music" in command.lower():
+        elif "stop music" in command_lower:
             self.youtube_music.stop_playback()
             return "Music stopped"
         
-        elif "volume" in command.lower():
+        elif "volume" in command_lower:
             # Extract volume level
-            if "up" in command.lower():
+            if "up" in command_lower:
                 self.youtube_music.volume_up()
                 return "Volume increased"
-            elif "down" in command.lower():
+            elif "down" in command_lower:
                 self.youtube_music.volume_down()
                 return "Volume decreased"
             else:
                 # Try to extract a number
-                import re
-                volume_match = re.search(r'(\d+)', command)
+                volume_match = _VOLUME_RE.search(command_lower)
                 if volume_match:
                     volume = int(volume_match.group(1))
                     self.youtube_music.set_volume(volume)
                     return f"Volume set to {volume}%"
         
         # Health data commands
-        elif "health" in command.lower() or "fitness" in command.lower():
-            if "summary" in command.lower() or "overview" in command.lower():
+        elif "health" in command_lower or "fitness" in command_lower:
+            if "summary" in command_lower or "overview" in command_lower:
                 summary = self.health_integration.get_health_summary()
                 interpretation = self.health_integration.interpret_health_data(summary)
                 return interpretation
             
-            elif "steps" in command.lower():
+            elif "steps" in command_lower:
                 steps_data = self.health_integration.get_step_data()
                 return f"Today you've taken {steps_data['steps']} steps, covering {steps_data['distance']:.2f} kilometers and burning {steps_data['calories']:.0f} calories."
             
-            elif "sleep" in command.lower():
+            elif "sleep" in command_lower:
                 sleep_data = self.health_integration.get_sleep_data()
                 return f"Last night you slept for {sleep_data['duration_formatted']} with a sleep quality score of {sleep_data['quality']:.1f}. Your deep sleep was {sleep_data['deep_sleep_minutes']} minutes."
             
-            elif "stress" in command.lower():
+            elif "stress" in command_lower:
                 stress_data = self.health_integration.get_stress_data()
                 return f"Your current stress level is {stress_data['stress_category']} with an average score of {stress_data['average_level']}."
             
-            elif "heart" in command.lower() or "pulse" in command.lower():
+            elif "heart" in command_lower or "pulse" in command_lower:
                 heart_data = self.health_integration.get_heart_rate_data("day")
                 return f"Your average heart rate today is {heart_data['average_bpm']} BPM, with a range from {heart_data['min_bpm']} to {heart_data['max_bpm']} BPM."
         
         # Privacy and security commands
-        elif "privacy" in command.lower() or "security" in command.lower():
-            if "report" in command.lower() or "status" in command.lower():
+        elif "privacy" in command_lower or "security" in command_lower:
+            if "report" in command_lower or "status" in command_lower:
                 report = self.security_manager.generate_privacy_report()
                 return self._format_privacy_report(report)
             
-            elif "wipe" in command.lower() or "delete" in command.lower() or "clear" in command.lower():
+            elif "wipe" in command_lower or "delete" in command_lower or "clear" in command_lower:
                 return "To protect your data, I require explicit confirmation. Please say 'confirm data wipe' if you want to delete all stored data."
             
-            elif "confirm data wipe" in command.lower():
+            elif "confirm data wipe" in command_lower:
                 success = self.security_manager.wipe_all_data(confirm=True)
                 if success:
                     return "All your data has been securely wiped from my storage."
                 else:
                     return "There was an error wiping the data. Please try again or check the logs."
             
-            elif "explain" in command.lower() or "how" in command.lower() or "works" in command.lower():
+            elif "explain" in command_lower or "how" in command_lower or "works" in command_lower:
                 return ("Your data is secured with encryption and stored only on your device. " 
                        "I use AES-256 encryption with a locally stored key that never leaves your device. "
                        "API calls are anonymized, and no personal data is shared with external services.")
         
         return response
     
-    def _detect_command_type(self, command: str) -> str:
-        """Detect the type of command for metadata"""
-        command_lower = command.lower()
-        
-        if "play" in command_lower or "music" in command_lower or "song" in command_lower:
-            return "music"
-        elif "health" in command_lower or "fitness" in command_lower or "steps" in command_lower:
-            return "health"
-        elif "privacy" in command_lower or "security" in command_lower or "data" in command_lower:
-            return "privacy"
-        elif "github" in command_lower or "code" in command_lower or "development" in command_lower:
-            return "development"
-        else:
-            return "general"
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _detect_command_type(command: str) -> str:
+        """Detect the type of command for metadata (cached, assistants see many repeated commands)"""
+        # One regex pass finds every category present; precedence follows the keyword table
+        found = {match.lastgroup for match in _COMMAND_TYPE_RE.finditer(command.lower())}
+        
+        for command_type, _ in _COMMAND_TYPE_KEYWORDS:
+            if command_type in found:
+                return command_type
+        return "general"
     
     def _format_privacy_report(self, report: Dict[str, Any]) -> str:
         """Format privacy report for user-friendly display"""
@@ -317,8 +388,35 @@ class Ana:
         return "\n".join(lines)
     
     def update_ui(self, state: Dict[str, Any]):
-        """Update UI with current state"""
-        self.ui_controller.update_state(state)
+        """Queue a UI state update; the flush loop sends the merged state"""
+        with self._ui_state_lock:
+            self._pending_ui_state.update(state)
+        self._ui_dirty.set()
+    
+    def _ui_flush_loop(self):
+        """Send pending UI state to the UI controller, one merged update per frame"""
+        while self.running:
+            if not self._ui_dirty.wait(0.5):
+                continue
+            
+            # Let updates from the same burst accumulate before flushing
+            time.sleep(self._ui_flush_interval)
+            self._flush_ui_state()
+        
+        # Send whatever arrived while stopping
+        self._flush_ui_state()
+    
+    def _flush_ui_state(self):
+        """Send the merged pending UI state to the UI controller, if any"""
+        with self._ui_state_lock:
+            state, self._pending_ui_state = self._pending_ui_state, {}
+            self._ui_dirty.clear()
+        
+        if state:
+            try:
+                self.ui_controller.update_state(state)
+            except Exception as e:
+                logger.error("Error updating UI state: %s", e)
     
     def run_task(self, task_name: str, **kwargs):
         """Run a specific task"""
@@ -378,7 +476,8 @@ class Ana:
             self.speak("Security audit complete. No issues found.")
         
         # Log detailed report
-        logger.info(f"Privacy audit results: {json.dumps(report)}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Privacy audit results: %s", _dumps(report))
         
         # Store audit record
         self.security_manager.store_user_data(
@@ -405,10 +504,10 @@ class Ana:
         else:
             return {"error": f"Unknown data type: {data_type}"}
     
-    def get_conversation_history(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get recent conversation history (for context)"""
+    def get_conversation_history(self, limit: int = 10) -> Iterator[Dict[str, Any]]:
+        """Get recent conversation history (for context), newest first and decrypted lazily"""
         # Use security manager to get encrypted conversations
-        return self.security_manager.get_conversations(
+        return self.security_manager.iter_conversations(
             session_id=self.session_id,
             limit=limit
         )
@@ -428,7 +527,7 @@ def main():
     except KeyboardInterrupt:
         logger.info("Keyboard interrupt received, shutting down")
     except Exception as e:
-        logger.error(f"Error in main loop: {str(e)}", exc_info=True)
+        logger.error("Error in main loop: %s", e, exc_info=True)
     finally:
         ana.stop()
 
@@ -2,11 +2,15 @@
 # Ana AI Assistant - Core Assistant Module
 
 import os
+import re
 import time
+import random
 import logging
 import threading
-import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from types import SimpleNamespace
 
 # Import core modules
 from ana.core.voice_engine import VoiceEngine, VoiceLanguage, VoiceEmotion
@@ -19,6 +23,70 @@ from ana.core.weather_api import WeatherAPI
 
 logger = logging.getLogger('Ana.Assistant')
 
+# Any character in the Devanagari Unicode block
+_DEVANAGARI_RE = re.compile(r"[\u0900-\u097F]")
+
+# Keyword groups used to pick a response emotion, matched against the lowercased user
+# text in one pass; the lookahead lets keywords overlap (e.g. "appreciatemergency")
+_USER_KEYWORDS_RE = re.compile(r"(?=(?P<thank>thank|appreciate)|(?P<urgent>help|urgent|emergency|problem))")
+_KEYWORD_BITS = {"thank": 1, "urgent": 2}
+_ALL_KEYWORD_BITS = 3
+_EXCITE_RE = re.compile(r"!|Wow|Great")
+
+# Opening phrases that get a formal address, in priority order
+_FORMAL_PHRASES = {
+    "Hello!": "Hello, {title}!",
+    "Hi there!": "Greetings, {title}.",
+    "Thank you": "Thank you, {title}",
+    "Yes": "Yes, {title}",
+    "No": "No, {title}",
+    "Sure": "Of course, {title}",
+    "Of course": "Of course, {title}",
+    "I can help": "I can help you, {title}",
+    "I'll do that": "I'll do that for you, {title}",
+    "Would you like": "Would you like, {title}"
+}
+
+# The same phrases grouped by their first two characters (every phrase is at least that long)
+_FORMAL_PHRASES_BY_PREFIX = {}
+for _phrase, _template in _FORMAL_PHRASES.items():
+    _FORMAL_PHRASES_BY_PREFIX.setdefault(_phrase[:2], []).append((_phrase, _template))
+del _phrase, _template
+
+@lru_cache(maxsize=256)
+def _replace_formal_phrase(text, title):
+    """Return text with its opening phrase made formal, or None if no phrase matches"""
+    # Only check phrases that share the text's first two characters
+    for phrase, template in _FORMAL_PHRASES_BY_PREFIX.get(text[:2], ()):
+        if text.startswith(phrase):
+            return text.replace(phrase, template.format(title=title), 1)
+    return None
+
+# Voice emotion for each combination of keyword bits; urgency outranks gratitude
+_EMOTION_BY_KEYWORD_BITS = (
+    VoiceEmotion.NEUTRAL,
+    VoiceEmotion.HAPPY,
+    VoiceEmotion.CONCERNED,
+    VoiceEmotion.CONCERNED
+)
+
+# Voice emotion used to respond to each detected user emotion
+_EMOTION_MAP = {
+    "neutral": VoiceEmotion.NEUTRAL,
+    "happy": VoiceEmotion.HAPPY,
+    "sad": VoiceEmotion.CONCERNED,
+    "angry": VoiceEmotion.SERIOUS,
+    "surprised": VoiceEmotion.EXCITED
+}
+
+# Greeting and voice emotion for each hour of the day (0-23)
+_GREETING_BY_HOUR = (
+    [("Good evening", VoiceEmotion.NEUTRAL)] * 5 +
+    [("Good morning", VoiceEmotion.HAPPY)] * 7 +
+    [("Good afternoon", VoiceEmotion.NEUTRAL)] * 6 +
+    [("Good evening", VoiceEmotion.NEUTRAL)] * 6
+)
+
 class AnaAssistant:
     """Core class for Ana AI Assistant"""
     
@@ -33,6 +101,12 @@ class AnaAssistant:
         self.processing = False
         self.user_title = "Master"  # Default form of address
         
+        # Flat snapshot of the nested settings read when services start
+        self.cfg = SimpleNamespace(
+            auto_update=settings["assistant"]["self_evolution"]["auto_update"],
+            facial_enabled=settings["features"]["facial_recognition"]["enabled"]
+        )
+        
         # Initialize components
         self.voice_engine = VoiceEngine(settings)
         self.memory = MemoryManager(settings)
@@ -46,16 +120,19 @@ class AnaAssistant:
         self.current_weather = None
         self.weather_location = settings.get("assistant", {}).get("weather_location", "New York")
         
-        # Event hooks
-        self.on_wake_callbacks = []
-        self.on_listen_callbacks = []
-        self.on_process_callbacks = []
-        self.on_speak_callbacks = []
-        self.on_idle_callbacks = []
-        self.on_face_detected_callbacks = []
+        # Event hooks, as immutable tuples replaced on registration so triggering needs no lock
+        self._callbacks = {event_type: () for event_type in
+                           ("wake", "listen", "process", "speak", "idle", "face_detected")}
+        self._callbacks_lock = threading.Lock()
         
-        # State variables
-        self.last_interaction = time.time()
+        # State variables (timestamps use time.monotonic())
+        self.last_interaction = time.monotonic()
+        self._loop_wake = threading.Event()
+        
+        # Shared workers for short background tasks (the assistant loop keeps its own thread)
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ana")
+        self._pending = set()
+        self._pending_lock = threading.Lock()
         self.face_detected = False
         self.user_mood = "neutral"
         
@@ -69,49 +146,70 @@ class AnaAssistant:
         logger.info("Starting assistant services...")
         self.running = True
         
-        # Initialize services in separate threads
-        threading.Thread(target=self.memory.initialize, daemon=True).start()
+        # Initialize services in the background
+        self._submit(self.memory.initialize)
         
         # Check for updates
-        if self.settings["assistant"]["self_evolution"]["auto_update"]:
-            threading.Thread(target=self.updater.check_for_updates, daemon=True).start()
+        if self.cfg.auto_update:
+            self._submit(self.updater.check_for_updates)
         
-        # Start voice engine in separate thread
-        threading.Thread(target=self.voice_engine.initialize, daemon=True).start()
+        # Start voice engine in the background
+        self._submit(self.voice_engine.initialize)
         
         # Initialize weather data
-        threading.Thread(target=self._update_weather_data, daemon=True).start()
+        self._submit(self._update_weather_data)
         
         # Start main assistant loop
         threading.Thread(target=self._assistant_loop, daemon=True).start()
         
         # Start facial recognition if enabled
-        if self.settings["features"]["facial_recognition"]["enabled"]:
-            threading.Thread(target=self._start_facial_recognition, daemon=True).start()
+        if self.cfg.facial_enabled:
+            self._submit(self._start_facial_recognition)
         
         # Speak introduction
         self.greet_user()
     
     def _assistant_loop(self):
-        """Main assistant loop that handles periodic tasks"""
+        """Main assistant loop that handles periodic tasks, sleeping until the next one is due"""
+        # Weather was just fetched by start_services, so the next refresh is 30 minutes out
+        next_weather_update = time.monotonic() + 1800
+        idle_notified_for = None
+        
         while self.running:
-            # Perform periodic tasks here
-            time.sleep(1)
-            
-            # Check idle time for idle animations
-            idle_time = time.time() - self.last_interaction
-            if idle_time > 30 and not self.speaking and not self.listening:
-                self._trigger_callbacks(self.on_idle_callbacks)
+            # Clear before reading state so an interaction recorded after this point wakes the wait below
+            self._loop_wake.clear()
+            now = time.monotonic()
             
             # Update weather data periodically (every 30 minutes)
-            if time.time() - self.last_weather_update > 1800:
-                threading.Thread(target=self._update_weather_data, daemon=True).start()
+            if now >= next_weather_update:
+                self._submit(self._update_weather_data)
+                next_weather_update = now + 1800
+            
+            # Trigger idle animations once per idle period (30 seconds without interaction)
+            next_idle_check = next_weather_update
+            if idle_notified_for != self.last_interaction:
+                next_idle_check = self.last_interaction + 30
+                if now >= next_idle_check:
+                    if self.speaking or self.listening:
+                        next_idle_check = now + 1
+                    else:
+                        self._trigger_callbacks("idle")
+                        idle_notified_for = self.last_interaction
+                        next_idle_check = next_weather_update
+            
+            # Sleep until the next task is due; interactions and shutdown wake the loop early
+            self._loop_wake.wait(max(0.0, min(next_idle_check, next_weather_update) - time.monotonic()))
+    
+    def _mark_interaction(self):
+        """Record user interaction and let the assistant loop reschedule its idle check"""
+        self.last_interaction = time.monotonic()
+        self._loop_wake.set()
     
     def _update_weather_data(self):
         """Update weather data from API"""
         try:
             self.current_weather = self.weather_api.get_current_weather(self.weather_location)
-            self.last_weather_update = time.time()
+            self.last_weather_update = time.monotonic()
             logger.info(f"Weather updated for {self.weather_location}")
         except Exception as e:
             logger.error(f"Error updating weather: {str(e)}")
@@ -119,7 +217,7 @@ class AnaAssistant:
     def get_weather_info(self):
         """Get current weather information"""
         # Update if data is old or doesn't exist
-        if not self.current_weather or time.time() - self.last_weather_update > 1800:
+        if not self.current_weather or time.monotonic() - self.last_weather_update > 1800:
             self._update_weather_data()
         
         return self.current_weather.get("current", {}) if self.current_weather else None
@@ -140,7 +238,7 @@ class AnaAssistant:
             self.settings["assistant"]["weather_location"] = location
         
         # Update weather data for new location
-        threading.Thread(target=self._update_weather_data, daemon=True).start()
+        self._submit(self._update_weather_data)
         
         return True
     
@@ -165,10 +263,10 @@ class AnaAssistant:
         """Handle face detection event"""
         if not self.face_detected:
             self.face_detected = True
-            self._trigger_callbacks(self.on_face_detected_callbacks)
+            self._trigger_callbacks("face_detected")
             
             # Greet user if not recently interacted
-            if time.time() - self.last_interaction > 60:
+            if time.monotonic() - self.last_interaction > 60:
                 self.speak(f"Welcome back, {self.user_title}. It's good to see you.")
     
     def _on_face_lost(self):
@@ -197,28 +295,11 @@ class AnaAssistant:
     
     def _map_user_emotion_to_voice_emotion(self, user_emotion):
         """Map user emotion to voice emotion for appropriate response"""
-        emotion_map = {
-            "neutral": VoiceEmotion.NEUTRAL,
-            "happy": VoiceEmotion.HAPPY,
-            "sad": VoiceEmotion.CONCERNED,
-            "angry": VoiceEmotion.SERIOUS,
-            "surprised": VoiceEmotion.EXCITED
-        }
-        return emotion_map.get(user_emotion, VoiceEmotion.NEUTRAL)
+        return _EMOTION_MAP.get(user_emotion, VoiceEmotion.NEUTRAL)
     
     def greet_user(self):
         """Greet the user based on time of day"""
-        hour = datetime.now().hour
-        
-        if 5 <= hour < 12:
-            greeting = "Good morning"
-            voice_emotion = VoiceEmotion.HAPPY
-        elif 12 <= hour < 18:
-            greeting = "Good afternoon"
-            voice_emotion = VoiceEmotion.NEUTRAL
-        else:
-            greeting = "Good evening"
-            voice_emotion = VoiceEmotion.NEUTRAL
+        greeting, voice_emotion = _GREETING_BY_HOUR[datetime.now().hour]
         
         # Add weather info if available
         weather_info = ""
@@ -242,8 +323,8 @@ class AnaAssistant:
             return False
             
         self.listening = True
-        self.last_interaction = time.time()
-        self._trigger_callbacks(self.on_listen_callbacks)
+        self._mark_interaction()
+        self._trigger_callbacks("listen")
         
         # Use voice engine to listen
         text = self.voice_engine.listen()
@@ -258,8 +339,8 @@ class AnaAssistant:
         """Process user input text"""
         logger.info(f"Processing input: {text}")
         self.processing = True
-        self.last_interaction = time.time()
-        self._trigger_callbacks(self.on_process_callbacks)
+        self._mark_interaction()
+        self._trigger_callbacks("process")
         
         # Add to memory
         self.memory.add_user_message(text)
@@ -288,30 +369,17 @@ class AnaAssistant:
     
     def _add_formal_address(self, text):
         """Add formal address to responses when appropriate"""
-        import random
-        
-        # List of phrases to replace
-        replacements = {
-            "Hello!": f"Hello, {self.user_title}!",
-            "Hi there!": f"Greetings, {self.user_title}.",
-            "Thank you": f"Thank you, {self.user_title}",
-            "Yes": f"Yes, {self.user_title}",
-            "No": f"No, {self.user_title}",
-            "Sure": f"Of course, {self.user_title}",
-            "Of course": f"Of course, {self.user_title}",
-            "I can help": f"I can help you, {self.user_title}",
-            "I'll do that": f"I'll do that for you, {self.user_title}",
-            "Would you like": f"Would you like, {self.user_title}"
-        }
-        
-        # Apply replacements
-        for phrase, replacement in replacements.items():
-            if text.startswith(phrase):
-                return text.replace(phrase, replacement, 1)
-        
-        # If no specific replacement, add formal address randomly at beginning or end
-        if len(text) > 0 and random.random() < 0.4:
-            if text[-1] in ['.', '!', '?']:
+        # Apply replacements (cached, as canned replies repeat)
+        replaced = _replace_formal_phrase(text, self.user_title)
+        if replaced is not None:
+            return replaced
+        
+        return self._maybe_append_title(text)
+    
+    def _maybe_append_title(self, text):
+        """Randomly append the formal address to the end of the text"""
+        if text and random.random() < 0.4:
+            if text[-1] in ".!?":
                 text = text[:-1] + f", {self.user_title}."
             else:
                 text = text + f", {self.user_title}."
@@ -320,23 +388,16 @@ class AnaAssistant:
     
     def _determine_response_emotion(self, user_text, response):
         """Determine appropriate emotion for response based on context"""
-        # Default to neutral
-        emotion = VoiceEmotion.NEUTRAL
-        
-        # Check for questions
-        if "?" in user_text:
-            emotion = VoiceEmotion.NEUTRAL
-        
-        # Check for gratitude
-        if any(word in user_text.lower() for word in ["thank", "thanks", "appreciate"]):
-            emotion = VoiceEmotion.HAPPY
-        
-        # Check for urgency or problems
-        if any(word in user_text.lower() for word in ["help", "urgent", "emergency", "problem"]):
-            emotion = VoiceEmotion.CONCERNED
+        # Check for gratitude and urgency in one scan (neutral if neither, questions included)
+        flags = 0
+        for match in _USER_KEYWORDS_RE.finditer(user_text.lower()):
+            flags |= _KEYWORD_BITS[match.lastgroup]
+            if flags == _ALL_KEYWORD_BITS:
+                break
+        emotion = _EMOTION_BY_KEYWORD_BITS[flags]
         
         # Check for excitement in response
-        if any(char in response for char in ["!", "Wow", "Great"]):
+        if _EXCITE_RE.search(response):
             emotion = VoiceEmotion.EXCITED
         
         # Mirror user's mood if appropriate
@@ -354,8 +415,8 @@ class AnaAssistant:
             
         logger.info(f"Speaking: {text}")
         self.speaking = True
-        self.last_interaction = time.time()
-        self._trigger_callbacks(self.on_speak_callbacks)
+        self._mark_interaction()
+        self._trigger_callbacks("speak")
         
         # Determine language for speech
         detected_language = self._detect_language(text)
@@ -366,12 +427,12 @@ class AnaAssistant:
         self.voice_engine.speak(text, language=language, emotion=emotion)
         
         self.speaking = False
-        self._trigger_callbacks(self.on_idle_callbacks)
+        self._trigger_callbacks("idle")
     
     def _detect_language(self, text):
         """Simple language detection for common languages"""
         # Basic detection of Hindi by checking for Devanagari Unicode range
-        if any(ord(char) >= 0x0900 and ord(char) <= 0x097F for char in text):
+        if _DEVANAGARI_RE.search(text):
             return VoiceLanguage.HINDI
         
         # Default to English
@@ -396,24 +457,27 @@ class AnaAssistant:
                 # Handle system actions
                 pass
     
+    def _submit(self, fn):
+        """Run fn on the shared pool, keeping its future so shutdown can cancel it"""
+        future = self._pool.submit(fn)
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard_future)
+        return future
+    
+    def _discard_future(self, future):
+        with self._pending_lock:
+            self._pending.discard(future)
+    
     def add_callback(self, event_type, callback):
         """Add callback for specific event"""
-        if event_type == "wake":
-            self.on_wake_callbacks.append(callback)
-        elif event_type == "listen":
-            self.on_listen_callbacks.append(callback)
-        elif event_type == "process":
-            self.on_process_callbacks.append(callback)
-        elif event_type == "speak":
-            self.on_speak_callbacks.append(callback)
-        elif event_type == "idle":
-            self.on_idle_callbacks.append(callback)
-        elif event_type == "face_detected":
-            self.on_face_detected_callbacks.append(callback)
+        if event_type in self._callbacks:
+            with self._callbacks_lock:
+                self._callbacks[event_type] = self._callbacks[event_type] + (callback,)
     
-    def _trigger_callbacks(self, callbacks):
-        """Trigger a list of callbacks"""
-        for callback in callbacks:
+    def _trigger_callbacks(self, event_type):
+        """Trigger the callbacks registered for an event"""
+        for callback in self._callbacks[event_type]:
             try:
                 callback()
             except Exception as e:
@@ -423,6 +487,14 @@ class AnaAssistant:
         """Shutdown the assistant gracefully"""
         logger.info("Shutting down assistant...")
         self.running = False
+        self._loop_wake.set()
+        
+        # Cancel queued tasks ourselves (shutdown's cancel_futures needs Python 3.9)
+        with self._pending_lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.cancel()
+        self._pool.shutdown(wait=False)
         self.voice_engine.shutdown()
         self.memory.shutdown()
         
@@ -433,5 +505,5 @@ class AnaAssistant:
     def on_wake_word_detected(self):
         """Handle wake word detection"""
         logger.info("Wake word detected!")
-        self._trigger_callbacks(self.on_wake_callbacks)
+        self._trigger_callbacks("wake")
         self.listen() 
\ No newline at end of file
@@ -2,32 +2,32 @@
 # Ana AI Assistant - Events Module (Minimal Implementation)
 
 import logging
-from typing import Dict, Callable, List, Any
+import threading
+from typing import Dict, Callable, Tuple, Any
 
 logger = logging.getLogger('Ana.Events')
 
-# Global event handlers dictionary
-_event_handlers: Dict[str, List[Callable]] = {}
+# Global event handlers dictionary; each tuple is replaced rather than mutated,
+# so trigger_event can iterate it without a lock while handlers are (un)registered
+_event_handlers: Dict[str, Tuple[Callable, ...]] = {}
+
+# Serializes the read-copy-replace in (un)register so concurrent writers don't lose handlers
+_handlers_lock = threading.Lock()
 
 def register_event_handler(event_name: str, handler_func: Callable) -> bool:
     """Register an event handler function for a specific event"""
-    global _event_handlers
-    
-    if event_name not in _event_handlers:
-        _event_handlers[event_name] = []
-    
-    _event_handlers[event_name].append(handler_func)
+    with _handlers_lock:
+        _event_handlers[event_name] = _event_handlers.get(event_name, ()) + (handler_func,)
     logger.debug(f"Registered handler for event: {event_name}")
     return True
 
 def trigger_event(event_name: str, *args, **kwargs) -> bool:
     """Trigger an event, calling all registered handlers"""
-    global _event_handlers
-    
-    if event_name not in _event_handlers:
+    handlers = _event_handlers.get(event_name)
+    if handlers is None:
         return False
     
-    for handler in _event_handlers[event_name]:
+    for handler in handlers:
         try:
             handler(*args, **kwargs)
         except Exception as e:
@@ -37,14 +37,13 @@ def trigger_event(event_name: str, *args, **kwargs) -> bool:
 
 def unregister_event_handler(event_name: str, handler_func: Callable) -> bool:
     """Unregister an event handler function"""
-    global _event_handlers
-    
-    if event_name not in _event_handlers:
-        return False
-    
-    if handler_func in _event_handlers[event_name]:
-        _event_handlers[event_name].remove(handler_func)
-        logger.debug(f"Unregistered handler for event: {event_name}")
-        return True
-    
-    return False 
\ No newline at end of file
+    with _handlers_lock:
+        handlers = _event_handlers.get(event_name)
+        if handlers is None or handler_func not in handlers:
+            return False
+        
+        index = handlers.index(handler_func)
+        _event_handlers[event_name] = handlers[:index] + handlers[index + 1:]
+    
+    logger.debug(f"Unregistered handler for event: {event_name}")
+    return True
@@ -4,6 +4,9 @@
 import os
 import cv2
 import time
+import queue
+import bisect
+import random
 import logging
 import threading
 import numpy as np
@@ -14,6 +17,10 @@ logger = logging.getLogger('Ana.FacialRecognition')
 class FacialRecognition:
     """Facial recognition module for Ana AI Assistant"""
     
+    # Placeholder emotion distribution (mostly neutral) as a cumulative table for bisect
+    _EMO = ("neutral", "happy", "sad", "surprised", "angry")
+    _CDF = (0.6, 0.8, 0.9, 0.95, 1.0)
+    
     def __init__(self, settings):
         """Initialize facial recognition with settings"""
         self.settings = settings
@@ -22,6 +29,30 @@ class FacialRecognition:
         self.detection_interval = 0.1  # Seconds between detections
         self.emotion_interval = 1.0  # Seconds between emotion detections
         
+        # YuNet CNN detector is used when a model is bundled; set "yunet": false to force Haar/DNN
+        facial_settings = settings.get("features", {}).get("facial_recognition", {})
+        self.use_yunet = facial_settings.get("yunet", True)
+        
+        # Optional GStreamer pipeline ending in appsink (e.g. nvarguscamerasrc/nvv4l2decoder on
+        # Jetson) so decoding and colour conversion run on hardware instead of the CPU
+        self.camera_pipeline = facial_settings.get("camera_pipeline")
+        
+        # Frames are shrunk by this factor before Haar/YuNet detection; after two empty
+        # downscaled detections in a row, one full-resolution pass checks for small faces
+        self.detection_scale = facial_settings.get("detection_scale", 0.5)
+        self._empty_detections = 0
+        
+        # Haar cascade parameters; raising haar_scale_factor or lowering haar_min_neighbors
+        # speeds detection up at the cost of missed faces and false positives
+        self.haar_scale_factor = facial_settings.get("haar_scale_factor", 1.1)
+        self.haar_min_neighbors = facial_settings.get("haar_min_neighbors", 5)
+        
+        # Between full detections, found faces are followed by cheap correlation trackers;
+        # detection re-runs every redetect_interval frames or as soon as a tracker is lost
+        self.redetect_interval = facial_settings.get("redetect_interval", 15)
+        self._trackers = []
+        self._frames_since_detection = 0
+        
         # Callback functions
         self.on_face_detected = None
         self.on_face_lost = None
@@ -29,8 +60,15 @@ class FacialRecognition:
         
         # State variables
         self.face_detected = False
-        self.last_emotion_time = 0
+        self.last_emotion_time = 0  # time.monotonic() of the last emotion check
         self.current_emotion = "neutral"
+        self._stop_event = threading.Event()
+        
+        # Latest (frame, face) awaiting emotion classification; the worker thread drains it so a
+        # slow emotion model never stalls detection, and stale crops are replaced, not queued
+        self._emotion_queue = queue.Queue(maxsize=1)
+        self._emotion_lock = threading.Lock()  # Makes the drop-and-replace in _offer_emotion_frame atomic
+        self._emotion_thread = None
         
         # Load models
         self._load_models()
@@ -39,6 +77,7 @@ class FacialRecognition:
     
     def _load_models(self):
         """Load face detection and emotion recognition models"""
+        self.yunet = None
         try:
             # Load face detection model (OpenCV's Haar Cascade)
             model_path = os.path.join(
@@ -58,6 +97,18 @@ class FacialRecognition:
                 
             logger.info("Face detection model loaded")
             
+            # MOSSE trackers need the opencv-contrib legacy module; without it every frame is detected
+            legacy = getattr(cv2, "legacy", None)
+            self._tracker_factory = getattr(legacy, "TrackerMOSSE_create", None)
+            if self._tracker_factory is not None:
+                logger.info("Face tracking between detections enabled")
+            
+            # Run Haar pre-processing through OpenCL (T-API) when a device is available
+            self.use_opencl = cv2.ocl.haveOpenCL()
+            if self.use_opencl:
+                cv2.ocl.setUseOpenCL(True)
+                logger.info(f"Using OpenCL device for face detection: {cv2.ocl.Device_getDefault().name()}")
+            
             # For emotion recognition, we would normally load a more sophisticated model
             # For simplicity, we'll use a basic approach here
             self.emotion_detection_available = False
@@ -76,17 +127,72 @@ class FacialRecognition:
                 
                 if os.path.exists(prototxt_path) and os.path.exists(model_path):
                     self.face_net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
+                    self._select_dnn_target()
+                    
+                    # Input buffer and box scale reused across frames
+                    self._dnn_resized = np.empty((300, 300, 3), np.uint8)
+                    self._dnn_frame_size = None
+                    self._dnn_box_scale = None
                     self.advanced_face_detection = True
                     logger.info("Advanced face detection model loaded")
                 else:
                     self.advanced_face_detection = False
             except:
                 self.advanced_face_detection = False
+            
+            # Prefer the YuNet CNN detector (int8-quantized if available) when its model file is present
+            if self.use_yunet:
+                self._load_yunet()
         
         except Exception as e:
             logger.error(f"Error loading facial recognition models: {str(e)}")
             self.face_cascade = None
     
+    def _load_yunet(self):
+        """Create the YuNet face detector from the first bundled model found"""
+        models_dir = os.path.join(os.path.dirname(__file__), "..", "assets", "models")
+        for filename in ("face_detection_yunet_2023mar_int8.onnx", "face_detection_yunet_2023mar.onnx"):
+            yunet_path = os.path.join(models_dir, filename)
+            if not os.path.exists(yunet_path):
+                continue
+            
+            try:
+                self.yunet = cv2.FaceDetectorYN.create(yunet_path, "", (320, 240))
+                self._yunet_input_size = (320, 240)
+                logger.info(f"YuNet face detection model loaded: {filename}")
+                return
+            except (AttributeError, cv2.error) as e:
+                logger.warning(f"Could not load YuNet face detection model {filename}: {str(e)}")
+    
+    def _select_dnn_target(self):
+        """Run the DNN face detector on CUDA, OpenVINO or OpenCL when available, otherwise on the CPU"""
+        try:
+            if hasattr(cv2, "cuda") and cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                self.face_net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+                self.face_net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA_FP16)
+                logger.info("Face detection DNN using CUDA")
+                return
+        except cv2.error:
+            pass
+        
+        # OpenVINO (Inference Engine) runs the network with its optimised CPU kernels,
+        # including int8/VNNI paths; only present in OpenCV builds with OpenVINO support
+        try:
+            ie_targets = cv2.dnn.getAvailableTargets(cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE)
+        except (AttributeError, cv2.error):
+            ie_targets = []
+        if cv2.dnn.DNN_TARGET_CPU in ie_targets:
+            self.face_net.setPreferableBackend(cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE)
+            self.face_net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+            logger.info("Face detection DNN using OpenVINO")
+            return
+        
+        if cv2.ocl.haveOpenCL():
+            cv2.ocl.setUseOpenCL(True)
+            self.face_net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.face_net.setPreferableTarget(cv2.dnn.DNN_TARGET_OPENCL)
+            logger.info("Face detection DNN using OpenCL")
+    
     def start(self):
         """Start facial recognition in a separate thread"""
         if self.face_cascade is None:
@@ -94,38 +200,64 @@ class FacialRecognition:
             return False
             
         self.running = True
+        self._stop_event.clear()
+        
+        # Discard anything left from a previous run, including stop()'s wake-up sentinel
+        with self._emotion_lock:
+            try:
+                self._emotion_queue.get_nowait()
+            except queue.Empty:
+                pass
+        
         threading.Thread(target=self._recognition_loop, daemon=True).start()
+        
+        # A worker still finishing a classification from before stop() carries on serving
+        if self._emotion_thread is None or not self._emotion_thread.is_alive():
+            self._emotion_thread = threading.Thread(target=self._emotion_worker, daemon=True)
+            self._emotion_thread.start()
         logger.info("Facial recognition started")
         return True
     
     def stop(self):
         """Stop facial recognition"""
         self.running = False
+        self._stop_event.set()  # Wake the recognition loop from its wait
+        self._offer_emotion_frame(None)  # Wake the emotion worker so it can exit
         logger.info("Facial recognition stopped")
     
     def _recognition_loop(self):
         """Main facial recognition loop"""
         try:
             # Initialize camera
-            cap = cv2.VideoCapture(self.camera_index)
+            if self.camera_pipeline:
+                cap = cv2.VideoCapture(self.camera_pipeline, cv2.CAP_GSTREAMER)
+            else:
+                cap = cv2.VideoCapture(self.camera_index)
             if not cap.isOpened():
                 logger.error("Could not open camera")
                 self.running = False
                 return
+            
+            if not self.camera_pipeline:
+                # Ask the driver for small frames at the detection rate rather than its full-size default
+                cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+                cap.set(cv2.CAP_PROP_FPS, 10)
                 
             logger.info("Camera opened successfully")
             
-            # Main loop
+            # Main loop, run at a fixed cadence so processing time does not add to the interval
+            next_tick = time.monotonic()
             while self.running:
                 # Capture frame-by-frame
                 ret, frame = cap.read()
                 if not ret:
                     logger.warning("Could not read frame from camera")
-                    time.sleep(1)  # Wait before retrying
+                    self._stop_event.wait(1)  # Wait before retrying
+                    next_tick = time.monotonic()
                     continue
                 
                 # Detect faces
-                faces = self._detect_faces(frame)
+                faces = self._detect_or_track_faces(frame)
                 
                 # Process detection results
                 if len(faces) > 0:
@@ -139,15 +271,10 @@ class FacialRecognition:
                             self.on_face_detected(face_data)
                     
                     # Process emotions periodically
-                    current_time = time.time()
+                    current_time = time.monotonic()
                     if current_time - self.last_emotion_time > self.emotion_interval:
                         self.last_emotion_time = current_time
-                        emotion = self._detect_emotion(frame, faces[0])
-                        
-                        # Call callback if emotion changed and callback is set
-                        if emotion != self.current_emotion and self.on_emotion_detected:
-                            self.current_emotion = emotion
-                            self.on_emotion_detected(emotion)
+                        self._offer_emotion_frame((frame, faces[0]))
                 else:
                     # No face detected
                     if self.face_detected:
@@ -157,8 +284,13 @@ class FacialRecognition:
                         if self.on_face_lost:
                             self.on_face_lost()
                 
-                # Wait before next detection
-                time.sleep(self.detection_interval)
+                # Wait until the next detection is due; if this frame overran, start again from now
+                next_tick += self.detection_interval
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+                else:
+                    next_tick = time.monotonic()
             
             # Release the camera when done
             cap.release()
@@ -167,58 +299,151 @@ class FacialRecognition:
             logger.error(f"Error in facial recognition loop: {str(e)}")
             self.running = False
     
+    def _offer_emotion_frame(self, item):
+        """Hand the newest item to the emotion worker, dropping one it has not picked up yet"""
+        # Producers (detection thread and stop()) are serialized, so once the stale item is
+        # taken the queue stays empty for this put
+        with self._emotion_lock:
+            try:
+                self._emotion_queue.put_nowait(item)
+            except queue.Full:
+                try:
+                    self._emotion_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self._emotion_queue.put_nowait(item)
+    
+    def _emotion_worker(self):
+        """Classify emotions off the detection thread"""
+        while not self._stop_event.is_set():
+            try:
+                item = self._emotion_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is None:
+                continue  # Wake-up from stop(); the loop condition decides whether to exit
+            
+            try:
+                emotion = self._detect_emotion(*item)
+                
+                # Call callback if emotion changed and callback is set
+                if emotion != self.current_emotion and self.on_emotion_detected:
+                    self.current_emotion = emotion
+                    self.on_emotion_detected(emotion)
+            except Exception as e:
+                logger.error(f"Error detecting emotion: {str(e)}")
+    
+    def _detect_or_track_faces(self, frame):
+        """Track known faces between periodic detections, falling back to detection when tracking fails"""
+        if self._trackers and self._frames_since_detection < self.redetect_interval:
+            faces = []
+            for tracker in self._trackers:
+                ok, box = tracker.update(frame)
+                if not ok:
+                    break
+                faces.append(tuple(int(v) for v in box))
+            else:
+                self._frames_since_detection += 1
+                return faces
+        
+        faces = self._detect_faces(frame)
+        self._frames_since_detection = 0
+        self._trackers = []
+        if self._tracker_factory is not None and self.redetect_interval > 1:
+            for face in faces:
+                tracker = self._tracker_factory()
+                tracker.init(frame, tuple(int(v) for v in face))
+                self._trackers.append(tracker)
+        
+        return faces
+    
     def _detect_faces(self, frame):
-        """Detect faces in the frame"""
-        if self.advanced_face_detection:
+        """Detect faces in the frame, returning boxes in full-frame coordinates"""
+        if self.yunet is None and self.advanced_face_detection:
+            # The DNN resizes its input to 300x300 itself
             return self._detect_faces_dnn(frame)
+        
+        # Detection cost grows with pixel count, so scan a downscaled copy and scale the boxes back up
+        if self._empty_detections >= 2 or self.detection_scale >= 1.0:
+            scale = 1.0
+            self._empty_detections = 0
+        else:
+            scale = self.detection_scale
+        
+        if self.yunet is not None:
+            if scale < 1.0:
+                frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            faces = self._detect_faces_yunet(frame)
         else:
-            return self._detect_faces_haar(frame)
+            faces = self._detect_faces_haar(frame, scale)
+        
+        if len(faces) == 0:
+            if scale < 1.0:
+                self._empty_detections += 1
+            return []
+        
+        self._empty_detections = 0
+        return [tuple(int(v / scale) for v in face) for face in faces]
+    
+    def _detect_faces_yunet(self, frame):
+        """Detect faces using the YuNet CNN"""
+        h, w = frame.shape[:2]
+        if (w, h) != self._yunet_input_size:
+            self.yunet.setInputSize((w, h))
+            self._yunet_input_size = (w, h)
+        
+        # Rows are x, y, w, h, five landmark points and a score
+        _, faces = self.yunet.detect(frame)
+        if faces is None:
+            return []
+        return [face[:4] for face in faces]
     
-    def _detect_faces_haar(self, frame):
-        """Detect faces using Haar Cascade"""
-        # Convert to grayscale for face detection
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    def _detect_faces_haar(self, frame, scale=1.0):
+        """Detect faces using Haar Cascade on a frame shrunk by scale"""
+        # Convert to grayscale before resizing so only one channel is resampled; as a UMat
+        # the intermediate images stay on the OpenCL device between calls
+        src = cv2.UMat(frame) if self.use_opencl else frame
+        gray = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
+        if scale < 1.0:
+            gray = cv2.resize(gray, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.equalizeHist(gray)
         
         # Detect faces
         faces = self.face_cascade.detectMultiScale(
             gray,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=(30, 30)
+            scaleFactor=self.haar_scale_factor,
+            minNeighbors=self.haar_min_neighbors,
+            minSize=(max(1, round(30 * scale)),) * 2
         )
         
         return faces
     
     def _detect_faces_dnn(self, frame):
         """Detect faces using DNN model"""
-        # Get frame dimensions
+        # Get frame dimensions, rebuilding the box scale only when they change
         h, w = frame.shape[:2]
+        if (w, h) != self._dnn_frame_size:
+            self._dnn_frame_size = (w, h)
+            self._dnn_box_scale = np.array([w, h, w, h], np.float32)
         
-        # Create a blob from the image
+        # Create a blob from the image, resizing into the preallocated buffer
+        cv2.resize(frame, (300, 300), dst=self._dnn_resized)
         blob = cv2.dnn.blobFromImage(
-            cv2.resize(frame, (300, 300)), 1.0,
-            (300, 300), (104.0, 177.0, 123.0)
+            self._dnn_resized, 1.0,
+            (300, 300), (104.0, 177.0, 123.0), swapRB=False, crop=False
         )
         
         # Pass the blob through the network
         self.face_net.setInput(blob)
         detections = self.face_net.forward()
         
-        # Process detections
-        faces = []
-        for i in range(detections.shape[2]):
-            confidence = detections[0, 0, i, 2]
-            
-            # Filter based on confidence
-            if confidence > 0.5:
-                # Convert to face rectangle coordinates
-                box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                x1, y1, x2, y2 = box.astype("int")
-                
-                # Convert to format expected by other functions
-                faces.append((x1, y1, x2-x1, y2-y1))
+        # Keep confident detections and convert their corners to face rectangles in one pass
+        det = detections[0, 0]
+        boxes = (det[det[:, 2] > 0.5, 3:7] * self._dnn_box_scale).astype(np.int32)
         
-        return faces
+        # Convert to (x, y, w, h), the format expected by other functions
+        boxes[:, 2:] -= boxes[:, :2]
+        return boxes
     
     def _detect_emotion(self, frame, face):
         """
@@ -229,8 +454,5 @@ class FacialRecognition:
         """
         # For demonstration, return a random emotion
         # In a real implementation, this would use an actual emotion recognition model
-        import random
-        emotions = ["neutral", "happy", "sad", "surprised", "angry"]
-        weights = [0.6, 0.2, 0.1, 0.05, 0.05]  # More likely to be neutral
-        
-        return random.choices(emotions, weights=weights)[0] 
\ No newline at end of file
+        index = bisect.bisect(self._CDF, random.random())
+        return self._EMO[min(index, len(self._EMO) - 1)] 
\ No newline at end of file
@@ -6,13 +6,28 @@ import re
 import json
 import time
 import logging
+import requests
 import subprocess
 import threading
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
+# Optional libgit2 bindings for in-process status and commits (push/pull still use git)
+try:
+    import pygit2
+    PYGIT2_AVAILABLE = True
+except ImportError:
+    PYGIT2_AVAILABLE = False
+
 logger = logging.getLogger('Ana.GitHubIntegration')
 
+# Inline credential helper for push/pull: answers git's credential request from the
+# environment, so the token is never written to disk or passed on the command line
+_CREDENTIAL_HELPER = '!f() { echo "username=$ANA_GIT_USERNAME"; echo "password=$ANA_GIT_TOKEN"; }; f'
+
+# Owner and repository name from an HTTPS or SSH GitHub remote URL
+_GITHUB_REPO_RE = re.compile(r'github\.com[/:]([\w-]+)/([\w.-]+?)(?:\.git)?/?$')
+
 class GitHubIntegration:
     """GitHub integration for Ana AI Assistant's self-evolution capabilities"""
     
@@ -30,17 +45,37 @@ class GitHubIntegration:
         self.main_branch = github_settings.get("main_branch", "main")
         self.auto_push = github_settings.get("auto_push", False)
         
+        # Commit in-process with pygit2 instead of 'git commit'. Opt-in because libgit2
+        # does not run the repo's pre-commit/commit-msg hooks or sign commits
+        self.in_process_commit = github_settings.get("in_process_commit", False)
+        
+        # Environment for git commands that talk to the remote (see _remote_git_command)
+        self._git_env = None
+        
         # Local repo settings
         self.repo_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        self._repo = None  # pygit2.Repository, opened on first use
+        
+        # GitHub API session, created on first use so connections are kept alive across calls
+        self._gh_session = None
+        
+        # Last repository status as (time.monotonic(), status); cleared by every write operation
+        self._status_cache = (0.0, None)
+        self._status_ttl = 1.0
         
         # Git command history
         self.command_history = []
         self.last_sync_time = time.time()
         self.sync_interval = 3600  # 1 hour
         
-        # Thread for auto-sync
+        # Thread for auto-sync; _wake interrupts its waits on shutdown
         self.running = False
         self.sync_thread = None
+        self._wake = threading.Event()
+        
+        # GitHub API endpoint for the configured repository, parsed once
+        self._owner, self._repo_name = None, None
+        self._gh_api_base = None
         
         logger.info("GitHub integration initialized")
     
@@ -58,6 +93,9 @@ class GitHubIntegration:
         # Configure git credentials if needed
         self._configure_git()
         
+        # Resolve the GitHub API endpoint for this repository
+        self._parse_repo_url()
+        
         # Check repository status
         status = self._check_repo_status()
         if not status["initialized"]:
@@ -71,6 +109,7 @@ class GitHubIntegration:
         # Start auto-sync thread if enabled
         if self.auto_push:
             self.running = True
+            self._wake.clear()
             self.sync_thread = threading.Thread(target=self._auto_sync_loop, daemon=True)
             self.sync_thread.start()
             logger.info("GitHub auto-sync started")
@@ -78,6 +117,14 @@ class GitHubIntegration:
         logger.info("GitHub integration started successfully")
         return True
     
+    def _parse_repo_url(self):
+        """Cache the owner, repository name and API base URL from repo_url"""
+        match = _GITHUB_REPO_RE.search(self.repo_url)
+        self._owner, self._repo_name = match.groups() if match else (None, None)
+        self._gh_api_base = (
+            f"https://api.github.com/repos/{self._owner}/{self._repo_name}" if match else None
+        )
+    
     def _check_git_installed(self) -> bool:
         """Check if git is installed and accessible"""
         try:
@@ -94,46 +141,56 @@ class GitHubIntegration:
                 subprocess.run(["git", "config", "user.name", self.username], cwd=self.repo_dir, check=True)
                 subprocess.run(["git", "config", "user.email", self.email], cwd=self.repo_dir, check=True)
                 
-                # Configure credential helper if token is provided
+                # Hand the token to push/pull through the environment instead of a credential store
                 if self.token:
-                    subprocess.run(["git", "config", "credential.helper", "store"], cwd=self.repo_dir, check=True)
-                    
-                    # Store credentials in a secure way (this is a simplified approach)
-                    repo_domain = self._extract_domain_from_url(self.repo_url)
-                    if repo_domain:
-                        # Create a temporary credential file
-                        cred_file = os.path.expanduser("~/.git-credentials-temp")
-                        with open(cred_file, "w") as f:
-                            f.write(f"https://{self.username}:{self.token}@{repo_domain}\n")
-                        
-                        # Import credentials
-                        subprocess.run(["git", "credential", "approve"], input=f"url=https://{repo_domain}\nusername={self.username}\npassword={self.token}\n", text=True, cwd=self.repo_dir)
-                        
-                        # Remove temporary file
-                        os.remove(cred_file)
+                    self._git_env = {
+                        **os.environ,
+                        "GIT_TERMINAL_PROMPT": "0",
+                        "ANA_GIT_USERNAME": self.username,
+                        "ANA_GIT_TOKEN": self.token
+                    }
                 
                 logger.info("Git credentials configured")
             except subprocess.SubprocessError as e:
                 logger.error(f"Error configuring git: {str(e)}")
     
-    def _extract_domain_from_url(self, url: str) -> Optional[str]:
-        """Extract domain from repository URL"""
-        if not url:
-            return None
-            
-        # Match pattern like https://github.com/username/repo.git or git@github.com:username/repo.git
-        https_match = re.match(r"https://([^/]+)/", url)
-        ssh_match = re.match(r"git@([^:]+):", url)
-        
-        if https_match:
-            return https_match.group(1)
-        elif ssh_match:
-            return ssh_match.group(1)
-        else:
-            return None
+    def _remote_git_command(self, *args: str) -> List[str]:
+        """Git command line for a remote operation, using the token credential helper if configured"""
+        if self._git_env is None:
+            return ["git", *args]
+        # The empty helper clears any inherited helpers so only the token is offered
+        return ["git", "-c", "credential.helper=", "-c", f"credential.helper={_CREDENTIAL_HELPER}", *args]
     
     def _check_repo_status(self) -> Dict[str, Any]:
-        """Check status of the git repository"""
+        """Check status of the git repository, reusing a status read within the last second"""
+        timestamp, status = self._status_cache
+        if status is not None and time.monotonic() - timestamp < self._status_ttl:
+            return dict(status)
+        
+        status = self._read_repo_status()
+        self._status_cache = (time.monotonic(), status)
+        return dict(status)
+    
+    def _invalidate_status(self):
+        """Drop the cached repository status after a write operation"""
+        self._status_cache = (0.0, None)
+    
+    def _get_current_branch(self) -> str:
+        """Name of the checked-out branch, from the status cache when fresh"""
+        timestamp, status = self._status_cache
+        if status is not None and time.monotonic() - timestamp < self._status_ttl:
+            return status["current_branch"] or ""
+        
+        repo = self._get_repo()
+        if repo is not None:
+            return self._current_branch(repo)
+        
+        result = subprocess.run(["git", "branch", "--show-current"], 
+                              cwd=self.repo_dir, capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    
+    def _read_repo_status(self) -> Dict[str, Any]:
+        """Read the status of the git repository"""
         status = {
             "initialized": False,
             "current_branch": None,
@@ -149,15 +206,23 @@ class GitHubIntegration:
             
             status["initialized"] = True
             
+            # Read status in-process when libgit2 is available
+            repo = self._get_repo()
+            if repo is not None:
+                status["current_branch"] = self._current_branch(repo)
+                status["uncommitted_changes"] = self._has_changes(repo)
+                status["remote_configured"] = len(repo.remotes) > 0
+                return status
+            
             # Get current branch
             result = subprocess.run(["git", "branch", "--show-current"], 
                                    cwd=self.repo_dir, capture_output=True, text=True, check=True)
             status["current_branch"] = result.stdout.strip()
             
             # Check for uncommitted changes
-            result = subprocess.run(["git", "status", "--porcelain"], 
-                                   cwd=self.repo_dir, capture_output=True, text=True, check=True)
-            status["uncommitted_changes"] = bool(result.stdout.strip())
+            result = subprocess.run(["git", "status", "--porcelain", "-z"], 
+                                   cwd=self.repo_dir, capture_output=True, check=True)
+            status["uncommitted_changes"] = bool(result.stdout)
             
             # Check if remote is configured
             result = subprocess.run(["git", "remote", "-v"], 
@@ -169,6 +234,67 @@ class GitHubIntegration:
         except subprocess.SubprocessError as e:
             logger.error(f"Error checking repository status: {str(e)}")
             return status
+        except Exception as e:
+            logger.error(f"Error checking repository status: {str(e)}")
+            return status
+    
+    def _get_repo(self):
+        """Open the repository with pygit2, or return None to fall back to the git CLI"""
+        if self._repo is None and PYGIT2_AVAILABLE and os.path.isdir(os.path.join(self.repo_dir, ".git")):
+            try:
+                self._repo = pygit2.Repository(self.repo_dir)
+            except pygit2.GitError as e:
+                logger.warning(f"Could not open repository with pygit2: {str(e)}")
+        return self._repo
+    
+    def _current_branch(self, repo) -> str:
+        """Name of the checked-out branch ("" when HEAD is detached), like git branch --show-current"""
+        if repo.head_is_detached:
+            return ""
+        target = repo.references["HEAD"].target
+        return target[len("refs/heads/"):] if target.startswith("refs/heads/") else ""
+    
+    def _has_changes(self, repo) -> bool:
+        """Whether the work tree has changes that git status --porcelain would list"""
+        return any(flags != pygit2.GIT_STATUS_IGNORED for flags in repo.status().values())
+    
+    def _commit_with_pygit2(self, repo, message: str, files: List[str] = None) -> bool:
+        """Stage and commit changes in-process with libgit2 (skips hooks and signing)"""
+        try:
+            # Add files
+            index = repo.index
+            index.read()
+            if files:
+                # Add specific files
+                for file in files:
+                    if os.path.exists(os.path.join(self.repo_dir, file)):
+                        index.add(file)
+            else:
+                # Add all changes; add_all only sees files that exist, so
+                # update_all is needed to stage deletions as well
+                index.add_all()
+                index.update_all()
+            index.write()
+            tree = index.write_tree()
+            
+            # Skip the commit if the staged tree matches HEAD
+            parents = [] if repo.head_is_unborn else [repo.head.target]
+            if parents and repo[parents[0]].tree_id == tree:
+                logger.info("No changes to commit")
+                return True
+            
+            # Commit changes (author and committer come from user.name/user.email)
+            signature = repo.default_signature
+            repo.create_commit("HEAD", signature, signature, message, tree, parents)
+            self._invalidate_status()
+            
+            logger.info(f"Changes committed: {message}")
+            self.command_history.append(f"Commit: {message}")
+            return True
+            
+        except (pygit2.GitError, KeyError) as e:
+            logger.error(f"Error committing changes: {str(e)}")
+            return False
     
     def _init_repository(self) -> bool:
         """Initialize git repository"""
@@ -207,6 +333,7 @@ class GitHubIntegration:
                               cwd=self.repo_dir, check=True)
                 logger.info("Created initial commit")
             
+            self._invalidate_status()
             return True
             
         except subprocess.SubprocessError as e:
@@ -229,28 +356,38 @@ class GitHubIntegration:
                     self.sync_with_remote()
                     self.last_sync_time = time.time()
                 
-                # Sleep to avoid high CPU usage
-                time.sleep(300)  # Check every 5 minutes
+                # Wait before checking again; returns early when shutdown sets the event
+                if self._wake.wait(300):  # Check every 5 minutes
+                    break
                 
             except Exception as e:
                 logger.error(f"Error in auto-sync loop: {str(e)}")
-                time.sleep(1800)  # Sleep longer after an error (30 minutes)
+                if self._wake.wait(1800):  # Wait longer after an error (30 minutes)
+                    break
     
     def commit_changes(self, message: str, files: List[str] = None) -> bool:
         """Commit changes to the repository"""
         if not self.enabled:
             logger.warning("GitHub integration is disabled")
             return False
-            
+        
         try:
-            # Check for changes
-            status_result = subprocess.run(["git", "status", "--porcelain"], 
-                                         cwd=self.repo_dir, capture_output=True, text=True)
+            # Check for changes, in-process when pygit2 is available
+            repo = self._get_repo()
+            if repo is not None:
+                has_changes = self._has_changes(repo)
+            else:
+                status_result = subprocess.run(["git", "status", "--porcelain", "-z"], 
+                                             cwd=self.repo_dir, capture_output=True)
+                has_changes = bool(status_result.stdout)
             
-            if not status_result.stdout.strip():
+            if not has_changes:
                 logger.info("No changes to commit")
                 return True  # Not an error, just nothing to do
             
+            if repo is not None and self.in_process_commit:
+                return self._commit_with_pygit2(repo, message, files)
+            
             # Add files
             if files:
                 # Add specific files
@@ -265,6 +402,7 @@ class GitHubIntegration:
             # Commit changes
             result = subprocess.run(["git", "commit", "-m", message], 
                                    cwd=self.repo_dir, capture_output=True, text=True)
+            self._invalidate_status()
             
             # Check if commit was successful
             if "nothing to commit" in result.stdout or "nothing added to commit" in result.stdout:
@@ -291,13 +429,12 @@ class GitHubIntegration:
         try:
             # Get current branch if from_branch not specified
             if not from_branch:
-                result = subprocess.run(["git", "branch", "--show-current"], 
-                                      cwd=self.repo_dir, capture_output=True, text=True, check=True)
-                from_branch = result.stdout.strip() or self.main_branch
+                from_branch = self._get_current_branch() or self.main_branch
             
             # Create branch
             subprocess.run(["git", "checkout", "-b", branch_name, from_branch], 
                           cwd=self.repo_dir, check=True)
+            self._invalidate_status()
             
             logger.info(f"Created and switched to branch '{branch_name}' from '{from_branch}'")
             self.command_history.append(f"Create branch: {branch_name} from {from_branch}")
@@ -314,20 +451,15 @@ class GitHubIntegration:
             return False
             
         try:
-            # Check if branch exists
-            result = subprocess.run(["git", "branch"], 
-                                  cwd=self.repo_dir, capture_output=True, text=True, check=True)
-            
-            branches = [b.strip() for b in result.stdout.replace("*", "").split("\n") if b.strip()]
-            
             # Create branch if it doesn't exist
-            if branch_name not in branches:
+            if branch_name not in self._list_local_branches(check=True):
                 logger.warning(f"Branch '{branch_name}' doesn't exist, creating it")
                 return self.create_branch(branch_name)
             
             # Switch to branch
             subprocess.run(["git", "checkout", branch_name], 
                           cwd=self.repo_dir, check=True)
+            self._invalidate_status()
             
             logger.info(f"Switched to branch '{branch_name}'")
             self.command_history.append(f"Switch to branch: {branch_name}")
@@ -337,6 +469,12 @@ class GitHubIntegration:
             logger.error(f"Error switching branch: {str(e)}")
             return False
     
+    def _list_local_branches(self, check: bool = False) -> List[str]:
+        """Names of the local branches, one per line with no markers to strip"""
+        result = subprocess.run(["git", "for-each-ref", "--format=%(refname:short)", "refs/heads/"], 
+                              cwd=self.repo_dir, capture_output=True, text=True, check=check)
+        return result.stdout.splitlines()
+    
     def pull_changes(self, branch: str = None) -> bool:
         """Pull changes from remote repository"""
         if not self.enabled:
@@ -346,13 +484,12 @@ class GitHubIntegration:
         try:
             # Determine branch to pull
             if not branch:
-                result = subprocess.run(["git", "branch", "--show-current"], 
-                                      cwd=self.repo_dir, capture_output=True, text=True, check=True)
-                branch = result.stdout.strip() or self.main_branch
+                branch = self._get_current_branch() or self.main_branch
             
             # Pull changes
-            result = subprocess.run(["git", "pull", "origin", branch], 
-                                  cwd=self.repo_dir, capture_output=True, text=True)
+            result = subprocess.run(self._remote_git_command("pull", "origin", branch), 
+                                  cwd=self.repo_dir, capture_output=True, text=True, env=self._git_env)
+            self._invalidate_status()
             
             if result.returncode == 0:
                 logger.info(f"Successfully pulled changes from '{branch}'")
@@ -383,16 +520,15 @@ class GitHubIntegration:
         try:
             # Determine branch to push
             if not branch:
-                result = subprocess.run(["git", "branch", "--show-current"], 
-                                      cwd=self.repo_dir, capture_output=True, text=True, check=True)
-                branch = result.stdout.strip() or self.main_branch
+                branch = self._get_current_branch() or self.main_branch
             
             # Push changes
-            cmd = ["git", "push", "origin", branch]
+            cmd = self._remote_git_command("push", "origin", branch)
             if force:
                 cmd.append("--force")
                 
-            result = subprocess.run(cmd, cwd=self.repo_dir, capture_output=True, text=True)
+            result = subprocess.run(cmd, cwd=self.repo_dir, capture_output=True, text=True, env=self._git_env)
+            self._invalidate_status()
             
             if result.returncode == 0:
                 logger.info(f"Successfully pushed changes to 'origin/{branch}'")
@@ -442,10 +578,7 @@ class GitHubIntegration:
             branch_name = f"feature/{re.sub(r'[^\w-]', '_', feature_name.lower())}"
             
             # Check if branch exists
-            result = subprocess.run(["git", "branch"], 
-                                  cwd=self.repo_dir, capture_output=True, text=True)
-            
-            if branch_name in result.stdout:
+            if branch_name in self._list_local_branches():
                 self.switch_branch(branch_name)
             else:
                 self.create_feature_branch(feature_name)
@@ -464,27 +597,17 @@ class GitHubIntegration:
             target_branch = self.main_branch
             
         try:
-            # Extract owner and repo from URL
-            owner_repo_match = re.search(r'github\.com[/:]([\w-]+)/([\w-]+)', self.repo_url)
-            if not owner_repo_match:
+            # Owner and repo are parsed in start(); parse here if it was skipped
+            if self._gh_api_base is None:
+                self._parse_repo_url()
+            if self._gh_api_base is None:
                 return {"success": False, "message": "Could not parse GitHub repository URL"}
-                
-            owner, repo = owner_repo_match.groups()
-            repo = repo.replace(".git", "")
-            
-            # Create PR using GitHub API
-            import requests
             
             # Ensure all changes are pushed
             self.push_changes(source_branch)
             
-            # Create PR
-            url = f"https://api.github.com/repos/{owner}/{repo}/pulls"
-            headers = {
-                "Authorization": f"token {self.token}",
-                "Accept": "application/vnd.github.v3+json"
-            }
-            
+            # Create PR using GitHub API
+            url = self._gh_api_base + "/pulls"
             data = {
                 "title": title,
                 "body": description,
@@ -492,7 +615,7 @@ class GitHubIntegration:
                 "base": target_branch
             }
             
-            response = requests.post(url, headers=headers, json=data)
+            response = self._get_github_session().post(url, json=data, timeout=10)
             
             if response.status_code in (200, 201):
                 pr_data = response.json()
@@ -513,6 +636,16 @@ class GitHubIntegration:
             logger.error(f"Error creating pull request: {str(e)}")
             return {"success": False, "message": str(e)}
     
+    def _get_github_session(self) -> requests.Session:
+        """Session for GitHub API calls, with the auth headers set once"""
+        if self._gh_session is None:
+            self._gh_session = requests.Session()
+            self._gh_session.headers.update({
+                "Authorization": f"token {self.token}",
+                "Accept": "application/vnd.github.v3+json"
+            })
+        return self._gh_session
+    
     def get_command_history(self) -> List[str]:
         """Get history of git commands executed"""
         return self.command_history
@@ -521,10 +654,15 @@ class GitHubIntegration:
         """Shutdown GitHub integration"""
         logger.info("Shutting down GitHub integration")
         self.running = False
+        self._wake.set()
         
         if self.sync_thread and self.sync_thread.is_alive():
             self.sync_thread.join(timeout=2.0)
         
+        if self._gh_session is not None:
+            self._gh_session.close()
+            self._gh_session = None
+        
         # Commit any pending changes before shutdown
         if self.enabled and self.auto_push:
             status = self._check_repo_status()
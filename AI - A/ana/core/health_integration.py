@@ -2,17 +2,29 @@
 # Ana AI Assistant - Samsung Health Integration Module
 
 import os
-import json
 import time
 import logging
 import requests
 import sqlite3
 import threading
+import numpy as np
+from itertools import chain, repeat
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 
+from ..config.settings import load_json_cached, save_settings
+
 logger = logging.getLogger('Ana.HealthIntegration')
 
+# Refresh the access token this many seconds before it actually expires
+_TOKEN_EXPIRY_SKEW = 60
+
+# Bound parameters per statement (SQLite's default SQLITE_MAX_VARIABLE_NUMBER on older builds)
+_SQLITE_MAX_VARIABLES = 999
+
+# (connect, read) timeouts for Samsung Health HTTP calls, so the sync thread can't hang
+_HTTP_TIMEOUT = (3.05, 10)
+
 class HealthIntegration:
     """Samsung Health integration for Ana AI Assistant"""
     
@@ -38,12 +50,23 @@ class HealthIntegration:
         self.last_refresh = time.time() - 86400  # Force refresh on first run
         self.refresh_interval = 3600  # 1 hour default
         
-        # Initialize cache database
+        # Keep-alive HTTP session, created on first use
+        self._http = None
+        
+        # Random generator for the simulated sync data
+        self._rng = np.random.default_rng()
+        
+        # Initialize cache database (self._db is the one connection used for syncing
+        # and queries; _db_lock serializes access from the sync and caller threads and
+        # is re-entrant so get_health_summary can hold it across the individual getters)
+        self._db = None
+        self._db_lock = threading.RLock()
         self._init_cache_db()
         
-        # Thread for background data sync
+        # Thread for background data sync; _stop interrupts its waits on shutdown
         self.running = False
         self.sync_thread = None
+        self._stop = threading.Event()
         
         logger.info("Health integration initialized")
     
@@ -59,13 +82,14 @@ class HealthIntegration:
             return False
         
         # Refresh access token if needed
-        if time.time() > self.token_expiry:
+        if self._token_expiring():
             if not self._refresh_access_token():
                 logger.error("Failed to refresh access token")
                 return False
         
         # Start background sync thread
         self.running = True
+        self._stop.clear()
         self.sync_thread = threading.Thread(target=self._sync_loop, daemon=True)
         self.sync_thread.start()
         logger.info("Health integration started")
@@ -84,10 +108,27 @@ class HealthIntegration:
             
         return True
     
+    def _connect(self, **kwargs) -> sqlite3.Connection:
+        """Open a connection to the cache database with the per-connection pragmas applied"""
+        conn = sqlite3.connect(self.cache_db_path, **kwargs)
+        
+        # With WAL, synchronous=NORMAL only fsyncs at checkpoints instead of on every
+        # commit; these settings are per connection, unlike journal_mode
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-8000")
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+    
     def _init_cache_db(self):
         """Initialize the SQLite cache database"""
         try:
-            conn = sqlite3.connect(self.cache_db_path)
+            conn = self._connect(check_same_thread=False)
+            
+            # WAL lets readers run while the sync thread writes; the mode is stored in
+            # the database file, so it only needs setting once
+            conn.execute("PRAGMA journal_mode=WAL")
+            
             cursor = conn.cursor()
             
             # Create tables if they don't exist
@@ -134,12 +175,16 @@ class HealthIntegration:
             ''')
             
             conn.commit()
-            conn.close()
+            self._db = conn
             logger.info("Health cache database initialized")
             
         except sqlite3.Error as e:
             logger.error(f"Error initializing cache database: {str(e)}")
     
+    def _token_expiring(self) -> bool:
+        """Check whether the access token is missing or about to expire"""
+        return not self.access_token or time.time() > self.token_expiry - _TOKEN_EXPIRY_SKEW
+    
     def _refresh_access_token(self) -> bool:
         """Refresh the Samsung Health API access token"""
         if not self.refresh_token:
@@ -157,7 +202,7 @@ class HealthIntegration:
                 "refresh_token": self.refresh_token
             }
             
-            response = requests.post(url, data=data)
+            response = self._get_http_session().post(url, data=data, timeout=_HTTP_TIMEOUT)
             
             if response.status_code == 200:
                 token_data = response.json()
@@ -181,15 +226,21 @@ class HealthIntegration:
             logger.error(f"Error refreshing access token: {str(e)}")
             return False
     
+    def _get_http_session(self) -> requests.Session:
+        """Session for Samsung Health API calls, reusing connections between requests"""
+        if self._http is None:
+            self._http = requests.Session()
+            self._http.mount("https://", requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=2))
+        return self._http
+    
     def _update_tokens_in_settings(self):
         """Update tokens in the settings file"""
         try:
             settings_path = os.path.join(os.path.dirname(__file__), "..", "config", "settings.json")
             
-            if os.path.exists(settings_path):
-                with open(settings_path, 'r') as f:
-                    settings = json.load(f)
-                
+            # Parsed copy is reused while the file is unchanged; None if it doesn't exist
+            settings = load_json_cached(settings_path)
+            if settings is not None:
                 # Update token information
                 if "health_integration" not in settings:
                     settings["health_integration"] = {}
@@ -198,37 +249,35 @@ class HealthIntegration:
                 settings["health_integration"]["refresh_token"] = self.refresh_token
                 settings["health_integration"]["token_expiry"] = self.token_expiry
                 
-                # Write back to file
-                with open(settings_path, 'w') as f:
-                    json.dump(settings, f, indent=2)
-                    
-                logger.info("Updated tokens in settings file")
+                # Write back atomically (temp file + os.replace) so a crash can't corrupt it
+                if save_settings(settings):
+                    logger.info("Updated tokens in settings file")
                 
         except Exception as e:
             logger.error(f"Error updating tokens in settings: {str(e)}")
     
     def _sync_loop(self):
         """Background loop for syncing health data"""
-        while self.running:
+        while not self._stop.is_set():
             try:
                 # Check if it's time to refresh data
                 if time.time() - self.last_refresh > self.refresh_interval:
                     self._sync_health_data()
                     self.last_refresh = time.time()
                 
-                # Sleep to avoid high CPU usage
-                time.sleep(60)  # Check every minute
+                # Wait before checking again; returns early when shutdown sets the event
+                self._stop.wait(60)  # Check every minute
                 
             except Exception as e:
                 logger.error(f"Error in health data sync loop: {str(e)}")
-                time.sleep(300)  # Sleep longer after an error
+                self._stop.wait(300)  # Wait longer after an error
     
     def _sync_health_data(self):
         """Sync health data from Samsung Health API"""
         logger.info("Syncing health data from Samsung Health")
         
-        # Ensure token is valid
-        if time.time() > self.token_expiry:
+        # Ensure token is valid; a cached token is reused until shortly before expiry
+        if self._token_expiring():
             if not self._refresh_access_token():
                 logger.error("Failed to refresh token, skipping sync")
                 return
@@ -237,154 +286,163 @@ class HealthIntegration:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=7)
         
-        # Sync each data type
-        self._sync_step_data(start_date, end_date)
-        self._sync_sleep_data(start_date, end_date)
-        self._sync_stress_data(start_date, end_date)
-        self._sync_heart_rate_data(start_date, end_date)
+        # Format the day keys once for all of the daily tables
+        date_strs = [(start_date + timedelta(days=i)).strftime("%Y-%m-%d")
+                     for i in range((end_date - start_date).days + 1)]
+        
+        # One last_updated stamp for every row written by this sync
+        last_updated = int(time.time())
+        
+        # Sync each data type inside one transaction, so the whole week of all
+        # four tables is written with a single commit
+        with self._db_lock, self._db:
+            self._sync_step_data(date_strs, last_updated)
+            self._sync_sleep_data(date_strs, last_updated)
+            self._sync_stress_data(date_strs, last_updated)
+            self._sync_heart_rate_data(start_date, end_date, last_updated)
         
         logger.info("Health data sync completed")
     
-    def _sync_step_data(self, start_date, end_date):
+    def _changed_rows(self, cursor, table: str, key: str, columns: str, rows: List[tuple]) -> List[tuple]:
+        """Drop rows whose stored values already match, so unchanged data isn't rewritten"""
+        if not rows:
+            return rows
+        
+        # Rows are (key, *values, last_updated) in ascending key order; one range
+        # query fetches everything stored for them
+        cursor.execute(f"SELECT {key}, {columns} FROM {table} WHERE {key} >= ? AND {key} <= ?",
+                       (rows[0][0], rows[-1][0]))
+        existing = {row[0]: row for row in cursor}
+        return [row for row in rows if existing.get(row[0]) != row[:-1]]
+    
+    def _insert_rows(self, cursor, insert_sql: str, rows: List[tuple]):
+        """Insert rows with as few multi-VALUES statements as the parameter limit allows"""
+        if not rows:
+            return
+        
+        width = len(rows[0])
+        batch_size = _SQLITE_MAX_VARIABLES // width
+        placeholders = "(" + ", ".join("?" * width) + ")"
+        
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            cursor.execute(f"{insert_sql} VALUES " + ", ".join([placeholders] * len(batch)),
+                           list(chain.from_iterable(batch)))
+    
+    def _sync_step_data(self, date_strs: List[str], last_updated: int):
         """Sync step data from Samsung Health"""
         try:
             # In a real implementation, you would call the Samsung Health API
             # This is a simulated example using random data
-            import random
             
-            conn = sqlite3.connect(self.cache_db_path)
-            cursor = conn.cursor()
+            # Runs inside the transaction opened by _sync_health_data
+            cursor = self._db.cursor()
+            n = len(date_strs)
             
-            current_date = start_date
-            while current_date <= end_date:
-                date_str = current_date.strftime("%Y-%m-%d")
-                
-                # Generate simulated data
-                steps = random.randint(3000, 15000)
-                distance = steps * 0.0007  # km
-                calories = steps * 0.04  # kcal
-                
-                # Store in database
-                cursor.execute('''
-                INSERT OR REPLACE INTO steps (date, count, distance, calories, last_updated)
-                VALUES (?, ?, ?, ?, ?)
-                ''', (date_str, steps, distance, calories, int(time.time())))
-                
-                current_date += timedelta(days=1)
+            # Generate simulated data for every day in one batch
+            steps = self._rng.integers(3000, 15000, size=n, endpoint=True)
+            distance = steps * 0.0007  # km
+            calories = steps * 0.04  # kcal
             
-            conn.commit()
-            conn.close()
-            logger.info(f"Step data synced for {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
+            rows = list(zip(date_strs, steps.tolist(), distance.tolist(), calories.tolist(), repeat(last_updated)))
+            rows = self._changed_rows(cursor, "steps", "date", "count, distance, calories", rows)
+            
+            # Store in database with multi-row INSERT statements
+            self._insert_rows(cursor, "INSERT OR REPLACE INTO steps (date, count, distance, calories, last_updated)", rows)
+            
+            logger.info(f"Step data synced for {date_strs[0]} to {date_strs[-1]}")
             
         except Exception as e:
             logger.error(f"Error syncing step data: {str(e)}")
     
-    def _sync_sleep_data(self, start_date, end_date):
+    def _sync_sleep_data(self, date_strs: List[str], last_updated: int):
         """Sync sleep data from Samsung Health"""
         try:
             # In a real implementation, you would call the Samsung Health API
             # This is a simulated example using random data
-            import random
             
-            conn = sqlite3.connect(self.cache_db_path)
-            cursor = conn.cursor()
+            # Runs inside the transaction opened by _sync_health_data
+            cursor = self._db.cursor()
+            n = len(date_strs)
             
-            current_date = start_date
-            while current_date <= end_date:
-                date_str = current_date.strftime("%Y-%m-%d")
-                
-                # Generate simulated data
-                total_sleep = random.randint(5 * 60, 9 * 60)  # 5-9 hours in minutes
-                deep_sleep = int(total_sleep * random.uniform(0.1, 0.3))
-                rem_sleep = int(total_sleep * random.uniform(0.2, 0.3))
-                light_sleep = total_sleep - deep_sleep - rem_sleep
-                awake_time = random.randint(5, 30)
-                quality = random.uniform(50, 95)
-                
-                # Store in database
-                cursor.execute('''
-                INSERT OR REPLACE INTO sleep (date, duration, deep_sleep, light_sleep, rem_sleep, awake_time, quality, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (date_str, total_sleep, deep_sleep, light_sleep, rem_sleep, awake_time, quality, int(time.time())))
-                
-                current_date += timedelta(days=1)
+            # Generate simulated data for every day in one batch
+            total_sleep = self._rng.integers(5 * 60, 9 * 60, size=n, endpoint=True)  # 5-9 hours in minutes
+            deep_sleep = (total_sleep * self._rng.uniform(0.1, 0.3, size=n)).astype(np.int64)
+            rem_sleep = (total_sleep * self._rng.uniform(0.2, 0.3, size=n)).astype(np.int64)
+            light_sleep = total_sleep - deep_sleep - rem_sleep
+            awake_time = self._rng.integers(5, 30, size=n, endpoint=True)
+            quality = self._rng.uniform(50, 95, size=n)
             
-            conn.commit()
-            conn.close()
-            logger.info(f"Sleep data synced for {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
+            rows = list(zip(date_strs, total_sleep.tolist(), deep_sleep.tolist(), light_sleep.tolist(),
+                            rem_sleep.tolist(), awake_time.tolist(), quality.tolist(), repeat(last_updated)))
+            rows = self._changed_rows(cursor, "sleep", "date",
+                                      "duration, deep_sleep, light_sleep, rem_sleep, awake_time, quality", rows)
+            
+            # Store in database with multi-row INSERT statements
+            self._insert_rows(cursor, "INSERT OR REPLACE INTO sleep (date, duration, deep_sleep, light_sleep, rem_sleep, awake_time, quality, last_updated)", rows)
+            
+            logger.info(f"Sleep data synced for {date_strs[0]} to {date_strs[-1]}")
             
         except Exception as e:
             logger.error(f"Error syncing sleep data: {str(e)}")
     
-    def _sync_stress_data(self, start_date, end_date):
+    def _sync_stress_data(self, date_strs: List[str], last_updated: int):
         """Sync stress data from Samsung Health"""
         try:
             # In a real implementation, you would call the Samsung Health API
             # This is a simulated example using random data
-            import random
             
-            conn = sqlite3.connect(self.cache_db_path)
-            cursor = conn.cursor()
+            # Runs inside the transaction opened by _sync_health_data
+            cursor = self._db.cursor()
+            n = len(date_strs)
             
-            current_date = start_date
-            while current_date <= end_date:
-                date_str = current_date.strftime("%Y-%m-%d")
-                
-                # Generate simulated data
-                avg_level = random.randint(20, 60)
-                max_level = min(100, avg_level + random.randint(10, 40))
-                min_level = max(0, avg_level - random.randint(10, 20))
-                duration = random.randint(30, 120)  # minutes
-                
-                # Store in database
-                cursor.execute('''
-                INSERT OR REPLACE INTO stress (date, average_level, max_level, min_level, duration, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ''', (date_str, avg_level, max_level, min_level, duration, int(time.time())))
-                
-                current_date += timedelta(days=1)
+            # Generate simulated data for every day in one batch
+            avg_level = self._rng.integers(20, 60, size=n, endpoint=True)
+            max_level = np.minimum(100, avg_level + self._rng.integers(10, 40, size=n, endpoint=True))
+            min_level = np.maximum(0, avg_level - self._rng.integers(10, 20, size=n, endpoint=True))
+            duration = self._rng.integers(30, 120, size=n, endpoint=True)  # minutes
             
-            conn.commit()
-            conn.close()
-            logger.info(f"Stress data synced for {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
+            rows = list(zip(date_strs, avg_level.tolist(), max_level.tolist(), min_level.tolist(),
+                            duration.tolist(), repeat(last_updated)))
+            rows = self._changed_rows(cursor, "stress", "date",
+                                      "average_level, max_level, min_level, duration", rows)
+            
+            # Store in database with multi-row INSERT statements
+            self._insert_rows(cursor, "INSERT OR REPLACE INTO stress (date, average_level, max_level, min_level, duration, last_updated)", rows)
+            
+            logger.info(f"Stress data synced for {date_strs[0]} to {date_strs[-1]}")
             
         except Exception as e:
             logger.error(f"Error syncing stress data: {str(e)}")
     
-    def _sync_heart_rate_data(self, start_date, end_date):
+    def _sync_heart_rate_data(self, start_date, end_date, last_updated: int):
         """Sync heart rate data from Samsung Health"""
         try:
             # In a real implementation, you would call the Samsung Health API
             # This is a simulated example using random data
-            import random
             
-            conn = sqlite3.connect(self.cache_db_path)
-            cursor = conn.cursor()
+            # Runs inside the transaction opened by _sync_health_data
+            cursor = self._db.cursor()
             
-            # Clear existing data in the range
-            start_timestamp = int(start_date.timestamp())
+            # Data points fall on whole hours, so each sync replaces the previous
+            # sync's rows in place instead of deleting the range and re-inserting
+            start_timestamp = -(-int(start_date.timestamp()) // 3600) * 3600
             end_timestamp = int(end_date.timestamp())
-            cursor.execute("DELETE FROM heart_rate WHERE timestamp >= ? AND timestamp <= ?", 
+            
+            # Prune any off-the-hour points left in the range (a no-op once aligned)
+            cursor.execute("DELETE FROM heart_rate WHERE timestamp >= ? AND timestamp <= ? AND timestamp % 3600 != 0", 
                          (start_timestamp, end_timestamp))
             
-            # Generate data points every hour
-            current_time = start_date
-            while current_time <= end_date:
-                timestamp = int(current_time.timestamp())
-                
-                # Generate simulated heart rate
-                bpm = random.randint(60, 100)
-                
-                # Store in database
-                cursor.execute('''
-                INSERT INTO heart_rate (timestamp, bpm, last_updated)
-                VALUES (?, ?, ?)
-                ''', (timestamp, bpm, int(time.time())))
-                
-                current_time += timedelta(hours=1)
+            # Generate simulated heart rate data points every hour
+            timestamps = range(start_timestamp, end_timestamp + 1, 3600)
+            bpm = self._rng.integers(60, 100, size=len(timestamps), endpoint=True)
+            
+            rows = list(zip(timestamps, bpm.tolist(), repeat(last_updated)))
+            rows = self._changed_rows(cursor, "heart_rate", "timestamp", "bpm", rows)
+            
+            # Store in database with multi-row INSERT statements
+            self._insert_rows(cursor, "INSERT OR REPLACE INTO heart_rate (timestamp, bpm, last_updated)", rows)
             
-            conn.commit()
-            conn.close()
             logger.info(f"Heart rate data synced for {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
             
         except Exception as e:
@@ -398,13 +456,12 @@ class HealthIntegration:
         date_str = date.strftime("%Y-%m-%d")
         
         try:
-            conn = sqlite3.connect(self.cache_db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT count, distance, calories FROM steps WHERE date = ?", (date_str,))
-            result = cursor.fetchone()
-            
-            conn.close()
+            # Share the persistent connection with the sync thread
+            with self._db_lock:
+                cursor = self._db.cursor()
+                
+                cursor.execute("SELECT count, distance, calories FROM steps WHERE date = ?", (date_str,))
+                result = cursor.fetchone()
             
             if result:
                 return {
@@ -440,16 +497,15 @@ class HealthIntegration:
         date_str = date.strftime("%Y-%m-%d")
         
         try:
-            conn = sqlite3.connect(self.cache_db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT duration, deep_sleep, light_sleep, rem_sleep, awake_time, quality 
-                FROM sleep WHERE date = ?
-            """, (date_str,))
-            result = cursor.fetchone()
-            
-            conn.close()
+            # Share the persistent connection with the sync thread
+            with self._db_lock:
+                cursor = self._db.cursor()
+                
+                cursor.execute("""
+                    SELECT duration, deep_sleep, light_sleep, rem_sleep, awake_time, quality 
+                    FROM sleep WHERE date = ?
+                """, (date_str,))
+                result = cursor.fetchone()
             
             if result:
                 return {
@@ -491,34 +547,28 @@ class HealthIntegration:
         date_str = date.strftime("%Y-%m-%d")
         
         try:
-            conn = sqlite3.connect(self.cache_db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT average_level, max_level, min_level, duration 
-                FROM stress WHERE date = ?
-            """, (date_str,))
-            result = cursor.fetchone()
-            
-            conn.close()
+            # Share the persistent connection with the sync thread
+            with self._db_lock:
+                cursor = self._db.cursor()
+                
+                # Interpret stress level in the query itself
+                cursor.execute("""
+                    SELECT average_level, max_level, min_level, duration,
+                           CASE WHEN average_level < 30 THEN 'Low'
+                                WHEN average_level < 60 THEN 'Moderate'
+                                ELSE 'High' END
+                    FROM stress WHERE date = ?
+                """, (date_str,))
+                result = cursor.fetchone()
             
             if result:
-                # Interpret stress level
-                avg_level = result[0]
-                if avg_level < 30:
-                    stress_category = "Low"
-                elif avg_level < 60:
-                    stress_category = "Moderate"
-                else:
-                    stress_category = "High"
-                
                 return {
                     "date": date_str,
                     "average_level": result[0],
                     "max_level": result[1],
                     "min_level": result[2],
                     "duration_minutes": result[3],
-                    "stress_category": stress_category
+                    "stress_category": result[4]
                 }
             else:
                 return {
@@ -539,10 +589,11 @@ class HealthIntegration:
                 "error": str(e)
             }
     
-    def get_heart_rate_data(self, period: str = "day") -> Dict[str, Any]:
-        """Get heart rate data for a period (day, week, month)"""
+    def get_heart_rate_data(self, period: str = "day", end_time: Optional[datetime] = None) -> Dict[str, Any]:
+        """Get heart rate data for a period (day, week, month) ending at end_time or now"""
         try:
-            end_time = datetime.now()
+            if not end_time:
+                end_time = datetime.now()
             
             if period == "day":
                 start_time = end_time - timedelta(days=1)
@@ -556,43 +607,33 @@ class HealthIntegration:
             start_timestamp = int(start_time.timestamp())
             end_timestamp = int(end_time.timestamp())
             
-            conn = sqlite3.connect(self.cache_db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT timestamp, bpm FROM heart_rate 
-                WHERE timestamp >= ? AND timestamp <= ?
-                ORDER BY timestamp ASC
-            """, (start_timestamp, end_timestamp))
-            
-            results = cursor.fetchall()
-            
-            conn.close()
-            
-            data_points = []
-            bpm_values = []
-            
-            for timestamp, bpm in results:
-                time_str = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
-                data_points.append({"time": time_str, "bpm": bpm})
-                bpm_values.append(bpm)
-            
-            if bpm_values:
-                avg_bpm = sum(bpm_values) / len(bpm_values)
-                max_bpm = max(bpm_values)
-                min_bpm = min(bpm_values)
-            else:
-                avg_bpm = 0
-                max_bpm = 0
-                min_bpm = 0
+            # Share the persistent connection with the sync thread
+            with self._db_lock:
+                cursor = self._db.cursor()
+                
+                # Let SQLite compute the aggregates and format the local times
+                cursor.execute("""
+                    SELECT COUNT(*), AVG(bpm), MAX(bpm), MIN(bpm) FROM heart_rate 
+                    WHERE timestamp >= ? AND timestamp <= ?
+                """, (start_timestamp, end_timestamp))
+                count, avg_bpm, max_bpm, min_bpm = cursor.fetchone()
+                
+                cursor.execute("""
+                    SELECT strftime('%Y-%m-%d %H:%M:%S', timestamp, 'unixepoch', 'localtime'), bpm
+                    FROM heart_rate 
+                    WHERE timestamp >= ? AND timestamp <= ?
+                    ORDER BY timestamp ASC
+                """, (start_timestamp, end_timestamp))
+                
+                data_points = [{"time": time_str, "bpm": bpm} for time_str, bpm in cursor]
             
             return {
                 "period": period,
                 "data_points": data_points,
-                "average_bpm": round(avg_bpm, 1),
-                "max_bpm": max_bpm,
-                "min_bpm": min_bpm,
-                "count": len(data_points)
+                "average_bpm": round(avg_bpm or 0, 1),
+                "max_bpm": max_bpm or 0,
+                "min_bpm": min_bpm or 0,
+                "count": count
             }
                 
         except Exception as e:
@@ -610,21 +651,27 @@ class HealthIntegration:
             today = datetime.now()
             yesterday = today - timedelta(days=1)
             
-            # Get step data for today
-            steps_data = self.get_step_data(today)
-            
-            # Get sleep data for last night
-            sleep_data = self.get_sleep_data(yesterday)
-            
-            # Get stress data for today
-            stress_data = self.get_stress_data(today)
-            
-            # Get heart rate for last 24 hours
-            heart_rate_data = self.get_heart_rate_data("day")
+            # Hold the connection once and read all four tables from one snapshot
+            with self._db_lock:
+                self._db.execute("BEGIN")
+                try:
+                    # Get step data for today
+                    steps_data = self.get_step_data(today)
+                    
+                    # Get sleep data for last night
+                    sleep_data = self.get_sleep_data(yesterday)
+                    
+                    # Get stress data for today
+                    stress_data = self.get_stress_data(today)
+                    
+                    # Get heart rate for last 24 hours
+                    heart_rate_data = self.get_heart_rate_data("day", today)
+                finally:
+                    self._db.commit()
             
-            # Create summary
+            # Create summary (the step data already carries today's date string)
             summary = {
-                "date": today.strftime("%Y-%m-%d"),
+                "date": steps_data["date"],
                 "steps": {
                     "count": steps_data["steps"],
                     "distance_km": round(steps_data["distance"], 2),
@@ -743,6 +790,16 @@ class HealthIntegration:
         """Shutdown health integration"""
         logger.info("Shutting down health integration")
         self.running = False
+        self._stop.set()
         
         if self.sync_thread and self.sync_thread.is_alive():
-            self.sync_thread.join(timeout=2.0) 
\ No newline at end of file
+            self.sync_thread.join(timeout=2.0)
+        
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+        
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
\ No newline at end of file
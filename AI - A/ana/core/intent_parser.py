@@ -2,12 +2,28 @@
 # Ana AI Assistant - Intent Parser (Minimal Implementation)
 
 import os
+import re
 import logging
-import json
 from typing import Dict, List, Any, Tuple, Optional
 
+# Optional fast JSON backend, falling back to the standard library
+try:
+    import orjson
+    
+    _loads = orjson.loads
+except ImportError:
+    import json
+    
+    _loads = json.loads
+
 logger = logging.getLogger('Ana.IntentParser')
 
+# Emotion to show for each intent; intents not listed have none
+_EMOTION_BY_INTENT = {
+    "greeting": "happy",
+    "thanks": "happy",
+}
+
 class IntentParser:
     """Minimal intent parser implementation for testing"""
     
@@ -18,6 +34,7 @@ class IntentParser:
         # Load intents from file
         self.intents_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "intents.json")
         self.intents = self._load_intents()
+        self._matchers = self._compile_intents(self.intents)
         
         logger.info("Intent parser initialized")
     
@@ -25,8 +42,8 @@ class IntentParser:
         """Load intents from JSON file if available"""
         try:
             if os.path.exists(self.intents_file):
-                with open(self.intents_file, 'r') as f:
-                    return json.load(f)
+                with open(self.intents_file, 'rb') as f:
+                    return _loads(f.read())
             else:
                 # Create empty intents structure
                 return {
@@ -49,6 +66,19 @@ class IntentParser:
             logger.error(f"Error loading intents: {str(e)}")
             return {"intents": {}}
     
+    def _compile_intents(self, intents: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any], re.Pattern]]:
+        """Compile each intent's patterns into a single regex alternation"""
+        matchers = []
+        for intent_name, intent_data in intents.get("intents", {}).items():
+            patterns = [p.lower() for p in intent_data.get("patterns", []) if p]
+            if not patterns:
+                continue
+            
+            # Plain substring semantics, same as testing "pattern in text" for each pattern
+            alternation = "|".join(map(re.escape, patterns))
+            matchers.append((intent_name, intent_data, re.compile(alternation)))
+        return matchers
+    
     def parse(self, text: str) -> Tuple[str, List[Dict[str, Any]], Optional[str]]:
         """
         Parse user input and determine intent
@@ -58,29 +88,22 @@ class IntentParser:
         """
         text = text.lower()
         
-        # Very simple intent matching
-        for intent_name, intent_data in self.intents.get("intents", {}).items():
-            patterns = intent_data.get("patterns", [])
-            
-            for pattern in patterns:
-                if pattern.lower() in text:
-                    responses = intent_data.get("responses", [])
-                    response = responses[0] if responses else f"I understand you want to {intent_name}."
-                    
-                    # Simple action example for weather intent
-                    actions = []
-                    if intent_name == "weather":
-                        actions = [{"type": "weather", "action": "get_weather"}]
-                    
-                    # Determine emotion based on intent
-                    emotion = None
-                    if intent_name == "greeting":
-                        emotion = "happy"
-                    elif intent_name == "thanks":
-                        emotion = "happy"
-                    
-                    logger.info(f"Detected intent: {intent_name}")
-                    return response, actions, emotion
+        # Very simple intent matching: one regex scan per intent
+        for intent_name, intent_data, matcher in self._matchers:
+            if matcher.search(text):
+                responses = intent_data.get("responses", [])
+                response = responses[0] if responses else f"I understand you want to {intent_name}."
+                
+                # Simple action example for weather intent
+                actions = []
+                if intent_name == "weather":
+                    actions = [{"type": "weather", "action": "get_weather"}]
+                
+                # Determine emotion based on intent
+                emotion = _EMOTION_BY_INTENT.get(intent_name)
+                
+                logger.info(f"Detected intent: {intent_name}")
+                return response, actions, emotion
         
         # Default response if no intent matches
         return "I'm not sure I understand. Could you rephrase that, Master?", [], None 
\ No newline at end of file
@@ -5,6 +5,7 @@ import os
 import time
 import logging
 import json
+from collections import deque
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
@@ -16,9 +17,13 @@ class MemoryManager:
     def __init__(self, settings: Dict[str, Any]):
         """Initialize memory manager with settings"""
         self.settings = settings
-        self.conversations = []
-        self.tasks = []
-        self.reminders = []
+        
+        # Conversation history is a ring buffer capped at max_history_items; the oldest
+        # messages fall off in O(1). Tasks and reminders are never dropped, only queued
+        max_history = settings.get("memory", {}).get("max_history_items", 1000)
+        self.conversations = deque(maxlen=max_history)
+        self.tasks = deque()
+        self.reminders = deque()
         
         # Create memory directory if it doesn't exist
         self.memory_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "memory")
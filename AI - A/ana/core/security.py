@@ -3,11 +3,15 @@
 
 import os
 import json
+import time
 import base64
 import logging
 import hashlib
 import sqlite3
-from typing import Dict, Any, Optional, Union
+import threading
+from functools import singledispatch
+from itertools import chain
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 from pathlib import Path
 
@@ -17,8 +21,44 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
 
+# Optional fast JSON backend, falling back to the standard library
+try:
+    import orjson
+    
+    _loads = orjson.loads
+    
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    _loads = json.loads
+    
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
 logger = logging.getLogger('Ana.Security')
 
+_INSERT_CONVERSATION = """INSERT INTO conversation_history 
+                          (timestamp, session_id, user_message, assistant_message, metadata)
+                          VALUES (?, ?, ?, ?, ?)"""
+
+def _from_column(value: Union[str, bytes]) -> bytes:
+    """Encrypted bytes from a stored column; rows written before tokens were stored
+    directly as BLOBs hold them as base64 TEXT"""
+    return base64.b64decode(value) if isinstance(value, str) else value
+
+@singledispatch
+def _to_bytes(data: Union[str, bytes, dict]) -> bytes:
+    """Serialize a value to the bytes that get encrypted (bytes pass through)"""
+    return data
+
+@_to_bytes.register
+def _(data: dict) -> bytes:
+    return _dumps(data)
+
+@_to_bytes.register
+def _(data: str) -> bytes:
+    return data.encode('utf-8')
+
 class SecurityManager:
     """
     Manages security and privacy for all Ana data
@@ -40,20 +80,50 @@ class SecurityManager:
         self.data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
         self.security_dir = os.path.join(self.data_dir, "security")
         
-        # Create necessary directories
-        os.makedirs(self.security_dir, exist_ok=True)
+        # Create necessary directories; the security directory is owner-only so files created
+        # in it with the process umask (e.g. SQLite's -wal and -shm sidecars) stay private
+        os.makedirs(self.security_dir, mode=0o700, exist_ok=True)
+        os.chmod(self.security_dir, 0o700)
         
-        # Set up encryption key
+        # Set up encryption key (loaded or created on first encrypt/decrypt)
         self.key_file = os.path.join(self.security_dir, "key.bin")
-        self.encryption_key = self._load_or_create_key()
-        self.cipher_suite = Fernet(self.encryption_key)
+        self.encryption_key = None
+        self._cipher_suite = None
+        self._key_lock = threading.Lock()
         
-        # Initialize secure database
+        # Secure database, opened on first use (self._db is the one connection kept open
+        # for all reads and writes; _db_lock serializes access from different threads)
         self.db_path = os.path.join(self.security_dir, "secure_data.db")
-        self._init_secure_database()
+        self._conn = None
+        self._db_lock = threading.RLock()
+        
+        # Bumped whenever stored API credentials change so callers can cache them; listeners
+        # are called after each bump so caches can refresh without polling
+        self.credentials_epoch = 0
+        self._credentials_listeners = []
         
         logger.info("Security manager initialized")
     
+    @property
+    def cipher_suite(self) -> Fernet:
+        """Fernet cipher for the local key, set up on first use"""
+        if self._cipher_suite is None:
+            # Locked so concurrent first calls can't each create a different key
+            with self._key_lock:
+                if self._cipher_suite is None:
+                    self.encryption_key = self._load_or_create_key()
+                    self._cipher_suite = Fernet(self.encryption_key)
+        return self._cipher_suite
+    
+    @property
+    def _db(self) -> Optional[sqlite3.Connection]:
+        """Shared database connection, opened and set up on first use"""
+        if self._conn is None:
+            with self._db_lock:
+                if self._conn is None:
+                    self._init_secure_database()
+        return self._conn
+    
     def _load_or_create_key(self) -> bytes:
         """Load existing encryption key or create a new one"""
         if os.path.exists(self.key_file):
@@ -82,7 +152,14 @@ class SecurityManager:
     def _init_secure_database(self):
         """Initialize the secure SQLite database"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            
+            # WAL with synchronous=NORMAL only fsyncs at checkpoints instead of on every commit
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-20000")
+            
             cursor = conn.cursor()
             
             # Create tables for various data types
@@ -105,6 +182,11 @@ class SecurityManager:
             )
             ''')
             
+            # Session and recent-history queries read an already sorted index range
+            # instead of scanning and sorting the whole table
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_conv_session_ts ON conversation_history(session_id, timestamp DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_conv_ts ON conversation_history(timestamp DESC)")
+            
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS user_data (
                 key TEXT PRIMARY KEY,
@@ -123,10 +205,12 @@ class SecurityManager:
             ''')
             
             conn.commit()
-            conn.close()
+            self._conn = conn
             
-            # Set secure permissions
-            os.chmod(self.db_path, 0o600)  # Owner read/write only
+            # Set secure permissions on the database and the WAL files holding its recent pages
+            for path in (self.db_path, self.db_path + "-wal", self.db_path + "-shm"):
+                if os.path.exists(path):
+                    os.chmod(path, 0o600)  # Owner read/write only
             logger.info("Secure database initialized")
             
         except sqlite3.Error as e:
@@ -135,20 +219,11 @@ class SecurityManager:
     def encrypt(self, data: Union[str, bytes, dict]) -> bytes:
         """Encrypt data with local key"""
         if not self.encryption_enabled:
-            if isinstance(data, dict):
-                return json.dumps(data).encode('utf-8')
-            elif isinstance(data, str):
-                return data.encode('utf-8')
-            return data
+            return _to_bytes(data)
             
         try:
             # Convert data to bytes if it's not already
-            if isinstance(data, dict):
-                data_bytes = json.dumps(data).encode('utf-8')
-            elif isinstance(data, str):
-                data_bytes = data.encode('utf-8')
-            else:
-                data_bytes = data
+            data_bytes = _to_bytes(data)
                 
             # Encrypt the data
             encrypted_data = self.cipher_suite.encrypt(data_bytes)
@@ -157,10 +232,20 @@ class SecurityManager:
         except Exception as e:
             logger.error(f"Encryption error: {str(e)}")
             # Fall back to non-encrypted but encoded data
-            if isinstance(data, dict):
-                return json.dumps(data).encode('utf-8')
-            elif isinstance(data, str):
-                return data.encode('utf-8')
+            return _to_bytes(data)
+    
+    def encrypt_batch(self, items: Iterable[Union[str, bytes, dict]]) -> List[bytes]:
+        """Encrypt several values, looking up the cipher once for the whole batch"""
+        data = [_to_bytes(item) for item in items]
+        if not self.encryption_enabled:
+            return data
+        
+        try:
+            encrypt = self.cipher_suite.encrypt
+            return [encrypt(data_bytes) for data_bytes in data]
+        except Exception as e:
+            logger.error(f"Encryption error: {str(e)}")
+            # Fall back to non-encrypted but encoded data
             return data
     
     def decrypt(self, encrypted_data: bytes) -> Union[str, dict, bytes]:
@@ -168,7 +253,7 @@ class SecurityManager:
         if not self.encryption_enabled:
             try:
                 # Try to decode as JSON
-                return json.loads(encrypted_data.decode('utf-8'))
+                return _loads(encrypted_data)
             except:
                 # Return as decoded string if not JSON
                 try:
@@ -182,7 +267,7 @@ class SecurityManager:
             
             # Try to parse as JSON
             try:
-                return json.loads(decrypted_data.decode('utf-8'))
+                return _loads(decrypted_data)
             except:
                 # Return as string if not JSON
                 try:
@@ -195,21 +280,38 @@ class SecurityManager:
             # Return original data on error
             return encrypted_data
     
+    def decrypt_batch(self, items: Iterable[bytes]) -> List[Union[str, dict, bytes]]:
+        """Decrypt several values; each item falls back independently as in decrypt()"""
+        decrypt = self.decrypt
+        return [decrypt(item) for item in items]
+    
+    def add_credentials_listener(self, callback) -> None:
+        """Register a callable run (with no arguments) whenever stored API credentials change"""
+        self._credentials_listeners.append(callback)
+    
+    def _bump_credentials_epoch(self):
+        """Mark stored API credentials as changed and notify listeners"""
+        self.credentials_epoch += 1
+        for callback in list(self._credentials_listeners):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in credentials listener: {str(e)}")
+    
     def store_api_credentials(self, service: str, credentials: Dict[str, Any]):
         """Securely store API credentials"""
         try:
             encrypted_credentials = self.encrypt(credentials)
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "INSERT OR REPLACE INTO api_credentials (service, credentials, last_updated) VALUES (?, ?, ?)",
-                (service, base64.b64encode(encrypted_credentials).decode('ascii'), int(datetime.now().timestamp()))
-            )
+            with self._db_lock, self._db:
+                cursor = self._db.cursor()
+                
+                cursor.execute(
+                    "INSERT OR REPLACE INTO api_credentials (service, credentials, last_updated) VALUES (?, ?, ?)",
+                    (service, encrypted_credentials, int(time.time()))
+                )
             
-            conn.commit()
-            conn.close()
+            self._bump_credentials_epoch()
             logger.info(f"Stored API credentials for {service}")
             return True
             
@@ -220,16 +322,14 @@ class SecurityManager:
     def get_api_credentials(self, service: str) -> Optional[Dict[str, Any]]:
         """Retrieve API credentials for a service"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT credentials FROM api_credentials WHERE service = ?", (service,))
-            result = cursor.fetchone()
-            
-            conn.close()
+            with self._db_lock:
+                cursor = self._db.cursor()
+                
+                cursor.execute("SELECT credentials FROM api_credentials WHERE service = ?", (service,))
+                result = cursor.fetchone()
             
             if result:
-                encrypted_credentials = base64.b64decode(result[0])
+                encrypted_credentials = _from_column(result[0])
                 credentials = self.decrypt(encrypted_credentials)
                 return credentials
             else:
@@ -242,32 +342,31 @@ class SecurityManager:
     def store_conversation(self, user_message: str, assistant_message: str, 
                          session_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None):
         """Store conversation history securely"""
+        return self.store_conversations([(user_message, assistant_message, session_id, metadata)])
+    
+    def store_conversations(self, conversations: Iterable[Tuple[str, str, Optional[str], Optional[Dict[str, Any]]]]) -> bool:
+        """Store several (user_message, assistant_message, session_id, metadata) exchanges in one transaction"""
         try:
-            # Create session ID if not provided
-            if not session_id:
-                session_id = datetime.now().strftime("%Y%m%d%H%M%S")
+            # One clock read for the row timestamp and the default session ID
+            now = time.time()
+            timestamp = int(now)
+            default_session_id = time.strftime("%Y%m%d%H%M%S", time.localtime(now))
+            
+            session_ids = []
+            plaintexts = []
+            for user_message, assistant_message, session_id, metadata in conversations:
+                # Create session ID if not provided
+                session_ids.append(session_id or default_session_id)
                 
-            # Convert metadata to JSON string
-            metadata_json = json.dumps(metadata) if metadata else "{}"
-            
-            # Encrypt all data
-            encrypted_user_msg = base64.b64encode(self.encrypt(user_message)).decode('ascii')
-            encrypted_assistant_msg = base64.b64encode(self.encrypt(assistant_message)).decode('ascii')
-            encrypted_metadata = base64.b64encode(self.encrypt(metadata_json)).decode('ascii')
+                # Metadata is serialized to JSON bytes by encrypt_batch
+                plaintexts += (user_message, assistant_message, metadata or {})
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            # Encrypt all fields of all exchanges in one batch
+            encrypted = self.encrypt_batch(plaintexts)
+            rows = [(timestamp, session_id, *encrypted[i * 3:i * 3 + 3]) for i, session_id in enumerate(session_ids)]
             
-            cursor.execute(
-                """INSERT INTO conversation_history 
-                   (timestamp, session_id, user_message, assistant_message, metadata)
-                   VALUES (?, ?, ?, ?, ?)""",
-                (int(datetime.now().timestamp()), session_id, 
-                 encrypted_user_msg, encrypted_assistant_msg, encrypted_metadata)
-            )
-            
-            conn.commit()
-            conn.close()
+            with self._db_lock, self._db:
+                self._db.executemany(_INSERT_CONVERSATION, rows)
             
             return True
             
@@ -279,12 +378,55 @@ class SecurityManager:
                         limit: int = 100) -> list:
         """Retrieve conversation history"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            rows = self._fetch_conversation_rows(session_id, limit)
+        except Exception as e:
+            logger.error(f"Error retrieving conversations: {str(e)}")
+            return []
+        
+        if not rows:
+            return []
+        
+        try:
+            # Decrypt each column of every row in one batch, then zip the records back together
+            timestamps, sessions, user_msgs, assistant_msgs, metadata = zip(*rows)
+            n = len(rows)
+            decrypted = self.decrypt_batch(_from_column(value) for value in chain(user_msgs, assistant_msgs, metadata))
+            
+            return [
+                {
+                    'timestamp': timestamp,
+                    'session_id': session,
+                    'user_message': user_msg,
+                    'assistant_message': assistant_msg,
+                    'metadata': _loads(meta) if isinstance(meta, str) else meta
+                }
+                for timestamp, session, user_msg, assistant_msg, meta
+                in zip(timestamps, sessions, decrypted[:n], decrypted[n:2 * n], decrypted[2 * n:])
+            ]
+        except Exception as decrypt_error:
+            # Fall back to row by row so only the unreadable records are skipped
+            logger.error(f"Error decrypting conversation data: {str(decrypt_error)}")
+            return list(self._decrypt_conversation_rows(rows))
+    
+    def iter_conversations(self, session_id: Optional[str] = None,
+                           limit: int = 100) -> Iterator[Dict[str, Any]]:
+        """Yield conversation history newest first, decrypting each record only when it is consumed"""
+        try:
+            rows = self._fetch_conversation_rows(session_id, limit)
+        except Exception as e:
+            logger.error(f"Error retrieving conversations: {str(e)}")
+            return
+        
+        yield from self._decrypt_conversation_rows(rows)
+    
+    def _fetch_conversation_rows(self, session_id: Optional[str], limit: int) -> List[tuple]:
+        """Fetch (timestamp, session_id, user_message, assistant_message, metadata) rows, newest first"""
+        with self._db_lock:
+            cursor = self._db.cursor()
             
             if session_id:
                 cursor.execute(
-                    """SELECT timestamp, user_message, assistant_message, metadata 
+                    """SELECT timestamp, session_id, user_message, assistant_message, metadata 
                        FROM conversation_history 
                        WHERE session_id = ? 
                        ORDER BY timestamp DESC LIMIT ?""",
@@ -298,38 +440,29 @@ class SecurityManager:
                     (limit,)
                 )
             
-            results = cursor.fetchall()
-            conn.close()
-            
-            conversations = []
-            for row in results:
-                if session_id:
-                    timestamp, user_msg, assistant_msg, metadata = row
-                    session = session_id
-                else:
-                    timestamp, session, user_msg, assistant_msg, metadata = row
+            return cursor.fetchall()
+    
+    def _decrypt_conversation_rows(self, rows: Iterable[tuple]) -> Iterator[Dict[str, Any]]:
+        """Decrypt conversation rows one at a time, skipping any that fail"""
+        for timestamp, session, user_msg, assistant_msg, metadata in rows:
+            # Decrypt all data
+            try:
+                decrypted_user_msg, decrypted_assistant_msg, decrypted_metadata = self.decrypt_batch(
+                    _from_column(value) for value in (user_msg, assistant_msg, metadata)
+                )
                 
-                # Decrypt all data
-                try:
-                    decrypted_user_msg = self.decrypt(base64.b64decode(user_msg))
-                    decrypted_assistant_msg = self.decrypt(base64.b64decode(assistant_msg))
-                    decrypted_metadata = self.decrypt(base64.b64decode(metadata))
-                    
-                    conversations.append({
-                        'timestamp': timestamp,
-                        'session_id': session,
-                        'user_message': decrypted_user_msg,
-                        'assistant_message': decrypted_assistant_msg,
-                        'metadata': json.loads(decrypted_metadata) if isinstance(decrypted_metadata, str) else decrypted_metadata
-                    })
-                except Exception as decrypt_error:
-                    logger.error(f"Error decrypting conversation data: {str(decrypt_error)}")
-            
-            return conversations
-            
-        except Exception as e:
-            logger.error(f"Error retrieving conversations: {str(e)}")
-            return []
+                conversation = {
+                    'timestamp': timestamp,
+                    'session_id': session,
+                    'user_message': decrypted_user_msg,
+                    'assistant_message': decrypted_assistant_msg,
+                    'metadata': _loads(decrypted_metadata) if isinstance(decrypted_metadata, str) else decrypted_metadata
+                }
+            except Exception as decrypt_error:
+                logger.error(f"Error decrypting conversation data: {str(decrypt_error)}")
+                continue
+            
+            yield conversation
     
     def store_user_data(self, key: str, value: Any, data_type: Optional[str] = None):
         """Securely store user data by key"""
@@ -338,25 +471,22 @@ class SecurityManager:
             if data_type is None:
                 data_type = type(value).__name__
                 
-            # Convert value to string if it's not already
+            # Serialize containers to JSON bytes, anything else to its string form
             if isinstance(value, dict) or isinstance(value, list):
-                value_str = json.dumps(value)
+                value_str = _dumps(value)
             else:
                 value_str = str(value)
                 
             # Encrypt the value
-            encrypted_value = base64.b64encode(self.encrypt(value_str)).decode('ascii')
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            encrypted_value = self.encrypt(value_str)
             
-            cursor.execute(
-                "INSERT OR REPLACE INTO user_data (key, value, data_type, last_updated) VALUES (?, ?, ?, ?)",
-                (key, encrypted_value, data_type, int(datetime.now().timestamp()))
-            )
-            
-            conn.commit()
-            conn.close()
+            with self._db_lock, self._db:
+                cursor = self._db.cursor()
+                
+                cursor.execute(
+                    "INSERT OR REPLACE INTO user_data (key, value, data_type, last_updated) VALUES (?, ?, ?, ?)",
+                    (key, encrypted_value, data_type, int(time.time()))
+                )
             
             return True
             
@@ -367,13 +497,11 @@ class SecurityManager:
     def get_user_data(self, key: str) -> Optional[Any]:
         """Retrieve user data by key"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT value, data_type FROM user_data WHERE key = ?", (key,))
-            result = cursor.fetchone()
-            
-            conn.close()
+            with self._db_lock:
+                cursor = self._db.cursor()
+                
+                cursor.execute("SELECT value, data_type FROM user_data WHERE key = ?", (key,))
+                result = cursor.fetchone()
             
             if not result:
                 return None
@@ -381,11 +509,11 @@ class SecurityManager:
             encrypted_value, data_type = result
             
             # Decrypt the value
-            decrypted_value = self.decrypt(base64.b64decode(encrypted_value))
+            decrypted_value = self.decrypt(_from_column(encrypted_value))
             
             # Convert back to original type
             if data_type == 'dict' or data_type == 'list':
-                return json.loads(decrypted_value) if isinstance(decrypted_value, str) else decrypted_value
+                return _loads(decrypted_value) if isinstance(decrypted_value, str) else decrypted_value
             elif data_type == 'int':
                 return int(decrypted_value)
             elif data_type == 'float':
@@ -402,18 +530,15 @@ class SecurityManager:
     def store_github_token(self, repo: str, token: str) -> bool:
         """Securely store GitHub token"""
         try:
-            encrypted_token = base64.b64encode(self.encrypt(token)).decode('ascii')
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "INSERT OR REPLACE INTO github_tokens (repo, token, last_updated) VALUES (?, ?, ?)",
-                (repo, encrypted_token, int(datetime.now().timestamp()))
-            )
+            encrypted_token = self.encrypt(token)
             
-            conn.commit()
-            conn.close()
+            with self._db_lock, self._db:
+                cursor = self._db.cursor()
+                
+                cursor.execute(
+                    "INSERT OR REPLACE INTO github_tokens (repo, token, last_updated) VALUES (?, ?, ?)",
+                    (repo, encrypted_token, int(time.time()))
+                )
             
             return True
             
@@ -424,16 +549,14 @@ class SecurityManager:
     def get_github_token(self, repo: str) -> Optional[str]:
         """Retrieve GitHub token for a repository"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT token FROM github_tokens WHERE repo = ?", (repo,))
-            result = cursor.fetchone()
-            
-            conn.close()
+            with self._db_lock:
+                cursor = self._db.cursor()
+                
+                cursor.execute("SELECT token FROM github_tokens WHERE repo = ?", (repo,))
+                result = cursor.fetchone()
             
             if result:
-                encrypted_token = base64.b64decode(result[0])
+                encrypted_token = _from_column(result[0])
                 token = self.decrypt(encrypted_token)
                 return token
             else:
@@ -466,19 +589,21 @@ class SecurityManager:
             
             # Add specific instructions to not store data
             if "messages" in secure_request and isinstance(secure_request["messages"], list):
-                # Add privacy instruction as system message
+                # Add privacy instruction as system message (on copies, the caller may reuse its messages)
+                messages = list(secure_request["messages"])
                 has_system = False
-                for msg in secure_request["messages"]:
+                for i, msg in enumerate(messages):
                     if msg.get("role") == "system":
-                        msg["content"] += " Please do not store, remember, or use this conversation for training."
+                        messages[i] = {**msg, "content": msg["content"] + " Please do not store, remember, or use this conversation for training."}
                         has_system = True
                         break
                 
                 if not has_system:
-                    secure_request["messages"].insert(0, {
+                    messages.insert(0, {
                         "role": "system",
                         "content": "Please do not store, remember, or use this conversation for training."
                     })
+                secure_request["messages"] = messages
         
         elif api_name == "elevenlabs":
             # Similar privacy measures for ElevenLabs
@@ -574,12 +699,15 @@ class SecurityManager:
             return False
         
         try:
-            # Delete database
-            if os.path.exists(self.db_path):
-                os.remove(self.db_path)
-            
-            # Reinitialize database
-            self._init_secure_database()
+            with self._db_lock:
+                # Close the shared connection before deleting the database and its WAL files
+                self.close()
+                for path in (self.db_path, self.db_path + "-wal", self.db_path + "-shm"):
+                    if os.path.exists(path):
+                        os.remove(path)
+                
+                # The database is recreated empty on next use
+            self._bump_credentials_epoch()
             
             logger.info("All secure data wiped successfully")
             return True
@@ -598,30 +726,28 @@ class SecurityManager:
         }
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Count conversation history
-            cursor.execute("SELECT COUNT(*) FROM conversation_history")
-            report["data_counts"]["conversations"] = cursor.fetchone()[0]
-            
-            # Count API credentials
-            cursor.execute("SELECT COUNT(*), GROUP_CONCAT(service) FROM api_credentials")
-            count, services = cursor.fetchone()
-            report["data_counts"]["api_credentials"] = count
-            report["data_types"]["api_services"] = services.split(",") if services else []
-            
-            # Count user data
-            cursor.execute("SELECT COUNT(*), GROUP_CONCAT(key) FROM user_data")
-            count, keys = cursor.fetchone()
-            report["data_counts"]["user_data"] = count
-            report["data_types"]["user_data_keys"] = keys.split(",") if keys else []
-            
-            # Count GitHub tokens
-            cursor.execute("SELECT COUNT(*) FROM github_tokens")
-            report["data_counts"]["github_tokens"] = cursor.fetchone()[0]
-            
-            conn.close()
+            with self._db_lock:
+                cursor = self._db.cursor()
+                
+                # Count conversation history
+                cursor.execute("SELECT COUNT(*) FROM conversation_history")
+                report["data_counts"]["conversations"] = cursor.fetchone()[0]
+                
+                # Count API credentials
+                cursor.execute("SELECT COUNT(*), GROUP_CONCAT(service) FROM api_credentials")
+                count, services = cursor.fetchone()
+                report["data_counts"]["api_credentials"] = count
+                report["data_types"]["api_services"] = services.split(",") if services else []
+                
+                # Count user data
+                cursor.execute("SELECT COUNT(*), GROUP_CONCAT(key) FROM user_data")
+                count, keys = cursor.fetchone()
+                report["data_counts"]["user_data"] = count
+                report["data_types"]["user_data_keys"] = keys.split(",") if keys else []
+                
+                # Count GitHub tokens
+                cursor.execute("SELECT COUNT(*) FROM github_tokens")
+                report["data_counts"]["github_tokens"] = cursor.fetchone()[0]
             
             return report
             
@@ -630,4 +756,11 @@ class SecurityManager:
             return {
                 "error": str(e),
                 "report_time": datetime.now().isoformat()
-            } 
\ No newline at end of file
+            } 
+    
+    def close(self):
+        """Close the secure database connection"""
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -5,10 +5,14 @@ import os
 import json
 import logging
 import requests
+import tempfile
+import threading
 import time
 from typing import Dict, Any, Optional
 from datetime import datetime
 
+from ..config.settings import get_app_data_dir
+
 logger = logging.getLogger('Ana.WeatherAPI')
 
 class WeatherAPI:
@@ -36,9 +40,14 @@ class WeatherAPI:
         self.api_keys = {}
         self._load_api_keys()
         
-        # Cache for weather data
+        # Cache for weather data, persisted so a restart within the cache duration skips the API
         self.weather_cache = {}
         self.cache_duration = 3600  # Cache weather data for 1 hour
+        self._cache_path = os.path.join(get_app_data_dir(), "weather_cache.json")
+        # Guards cache mutation and the snapshot-and-write of the cache file; updates can
+        # come from the assistant's pool workers and a greeting at the same time
+        self._cache_lock = threading.Lock()
+        self._load_disk_cache()
         
         logger.info("Weather API initialized")
     
@@ -262,21 +271,67 @@ class WeatherAPI:
     
     def _add_to_cache(self, key: str, data: Dict[str, Any]):
         """Add weather data to cache"""
-        self.weather_cache[key] = {
-            "data": data,
-            "timestamp": time.time()
-        }
+        with self._cache_lock:
+            self.weather_cache[key] = {
+                "data": data,
+                "timestamp": time.time()
+            }
+            self._save_disk_cache()
+    
+    def _load_disk_cache(self):
+        """Load unexpired weather data cached by a previous run"""
+        try:
+            with open(self._cache_path, 'r') as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.debug(f"Ignoring weather cache file: {str(e)}")
+            return
+        
+        # Skip anything that isn't shaped like what _save_disk_cache writes
+        if not isinstance(cache, dict):
+            logger.debug("Ignoring weather cache file: not a JSON object")
+            return
+        
+        now = time.time()
+        for key, entry in cache.items():
+            if not isinstance(entry, dict) or "data" not in entry:
+                continue
+            timestamp = entry.get("timestamp")
+            if isinstance(timestamp, (int, float)) and now - timestamp < self.cache_duration:
+                self.weather_cache[key] = entry
+    
+    def _save_disk_cache(self):
+        """Write the weather cache to disk atomically (called with _cache_lock held)"""
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix="weather_cache.", suffix=".tmp",
+                                            dir=os.path.dirname(self._cache_path))
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.weather_cache, f)
+            os.replace(tmp_path, self._cache_path)
+            tmp_path = None
+        except (OSError, TypeError, ValueError) as e:
+            logger.debug(f"Could not write weather cache file: {str(e)}")
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
     
     def _get_from_cache(self, key: str) -> Optional[Dict[str, Any]]:
         """Get weather data from cache if not expired"""
-        if key in self.weather_cache:
-            cache_entry = self.weather_cache[key]
+        cache_entry = self.weather_cache.get(key)
+        if cache_entry is not None:
             if time.time() - cache_entry["timestamp"] < self.cache_duration:
                 logger.debug(f"Using cached weather data for {key}")
                 return cache_entry["data"]
             else:
                 # Cache expired
-                del self.weather_cache[key]
+                with self._cache_lock:
+                    self.weather_cache.pop(key, None)
         
         return None
     
@@ -398,7 +453,8 @@ class WeatherAPI:
         logger.info(f"Weather units set to: {units}")
         
         # Clear cache since units changed
-        self.weather_cache = {}
+        with self._cache_lock:
+            self.weather_cache = {}
 
 
 # For testing directly
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# Ana AI Assistant - Secure Storage Tests
+
+import sys
+import os
+import base64
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ana.core import security
+from ana.core.security import SecurityManager
+
+class TestSecureStorageFormat(unittest.TestCase):
+    """Encrypted columns written as raw BLOBs and legacy base64 TEXT both read back"""
+    
+    def setUp(self):
+        """Create a security manager whose data directory is a temporary directory"""
+        self.temp_dir = tempfile.mkdtemp()
+        with mock.patch.object(security, "__file__", os.path.join(self.temp_dir, "core", "security.py")):
+            self.manager = SecurityManager({})
+    
+    def tearDown(self):
+        """Close the database and remove the temporary directory"""
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _legacy(self, value):
+        """Encrypt a value the way rows were stored before BLOB storage"""
+        return base64.b64encode(self.manager.encrypt(value)).decode('ascii')
+    
+    def _column_type(self, query, params):
+        """Return the SQLite storage class of a single selected column"""
+        with self.manager._db_lock:
+            return self.manager._db.execute(query, params).fetchone()[0]
+    
+    def test_api_credentials(self):
+        """Test new and legacy API credential rows"""
+        self.manager.store_api_credentials("openai", {"api_key": "new-key"})
+        self.assertEqual(self._column_type("SELECT typeof(credentials) FROM api_credentials WHERE service = ?",
+                                           ("openai",)), "blob")
+        self.assertEqual(self.manager.get_api_credentials("openai"), {"api_key": "new-key"})
+        
+        with self.manager._db_lock, self.manager._db:
+            self.manager._db.execute(
+                "INSERT INTO api_credentials (service, credentials, last_updated) VALUES (?, ?, ?)",
+                ("weatherapi", self._legacy({"api_key": "old-key"}), 0)
+            )
+        self.assertEqual(self.manager.get_api_credentials("weatherapi"), {"api_key": "old-key"})
+    
+    def test_user_data(self):
+        """Test new and legacy user data rows"""
+        self.manager.store_user_data("prefs", {"theme": "dark"})
+        self.assertEqual(self._column_type("SELECT typeof(value) FROM user_data WHERE key = ?", ("prefs",)), "blob")
+        self.assertEqual(self.manager.get_user_data("prefs"), {"theme": "dark"})
+        
+        with self.manager._db_lock, self.manager._db:
+            self.manager._db.execute(
+                "INSERT INTO user_data (key, value, data_type, last_updated) VALUES (?, ?, ?, ?)",
+                ("count", self._legacy("42"), "int", 0)
+            )
+        self.assertEqual(self.manager.get_user_data("count"), 42)
+    
+    def test_github_token(self):
+        """Test new and legacy GitHub token rows"""
+        self.manager.store_github_token("ana/new", "ghp_new")
+        self.assertEqual(self.manager.get_github_token("ana/new"), "ghp_new")
+        
+        with self.manager._db_lock, self.manager._db:
+            self.manager._db.execute(
+                "INSERT INTO github_tokens (repo, token, last_updated) VALUES (?, ?, ?)",
+                ("ana/old", self._legacy("ghp_old"), 0)
+            )
+        self.assertEqual(self.manager.get_github_token("ana/old"), "ghp_old")
+    
+    def test_conversations(self):
+        """Test new and legacy conversation rows read back together"""
+        with self.manager._db_lock, self.manager._db:
+            self.manager._db.execute(
+                security._INSERT_CONVERSATION,
+                (1, "old", self._legacy("old question"), self._legacy("old answer"), self._legacy({"type": "general"}))
+            )
+        self.manager.store_conversation("new question", "new answer", session_id="new", metadata={"type": "music"})
+        
+        conversations = self.manager.get_conversations()
+        self.assertEqual(len(conversations), 2)
+        self.assertEqual([conv["session_id"] for conv in conversations], ["new", "old"])
+        self.assertEqual(conversations[0]["user_message"], "new question")
+        self.assertEqual(conversations[0]["metadata"], {"type": "music"})
+        self.assertEqual(conversations[1]["assistant_message"], "old answer")
+        self.assertEqual(conversations[1]["metadata"], {"type": "general"})
+        
+        # The record-by-record path handles both formats too
+        self.assertEqual([conv["user_message"] for conv in self.manager.iter_conversations()],
+                         ["new question", "old question"])
+
+if __name__ == '__main__':
+    unittest.main()